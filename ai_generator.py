@@ -2,21 +2,188 @@ import asyncio
 import subprocess
 import os
 import tempfile
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
 from templates import template_generator
+from circuit_breaker import claude_breaker
+from generation_cache import generation_cache
+from generation_stream import generation_streams, GenerationStream
+from progress import manager
+
+# 生成器版本号，生成流程变化导致旧缓存失效时递增
+GENERATOR_VERSION = "1"
+
+
+class ClaudeUnavailableError(Exception):
+    """Claude Code不可用（SDK未安装、CLI不存在），熔断器直接打开"""
+
+
+class ProgressThrottle:
+    """
+    生成进度节流：累计已生成的字符数、字节数和token数，
+    每秒最多推送max_rate次，事件只携带计数不携带生成内容
+    """
+    
+    def __init__(self, project_id: Optional[str], max_rate: float):
+        self.project_id = project_id
+        self.interval = 1.0 / max_rate if max_rate > 0 else None
+        self.chars = 0
+        self.bytes = 0
+        self.tokens: Optional[int] = None
+        self._last_emit = 0.0
+        self._dirty = False
+    
+    def add_text(self, text: str):
+        self.chars += len(text)
+        self.bytes += len(text.encode('utf-8'))
+        self._dirty = True
+    
+    def set_tokens(self, tokens: int):
+        self.tokens = tokens
+        self._dirty = True
+    
+    async def maybe_emit(self):
+        """距上次推送超过间隔时推送一次"""
+        if self.interval is None or not self._dirty:
+            return
+        if time.monotonic() - self._last_emit >= self.interval:
+            await self._emit()
+    
+    async def flush(self):
+        """推送最终计数"""
+        if self._dirty:
+            await self._emit()
+    
+    async def _emit(self):
+        self._last_emit = time.monotonic()
+        self._dirty = False
+        if not self.project_id:
+            return
+        
+        counters = {"chars": self.chars, "bytes": self.bytes}
+        message = f"📝 已生成 {self.chars} 字符..."
+        if self.tokens is not None:
+            counters["tokens"] = self.tokens
+            message = f"📝 已生成 {self.chars} 字符 ({self.tokens} tokens)..."
+        
+        await manager.broadcast_progress(self.project_id, message, "progress", counters)
 
 class AIGenerator:
     def __init__(self):
         self.timeout = 300  # 5分钟超时
+        self.progress_max_rate = 2.0  # 生成进度每秒最多推送次数，0表示只推送最终计数
+        self.deadline = 0.0  # 大于0时，超过该秒数仍未生成完成则先发布模板临时版本
+        self._inflight: Dict[str, asyncio.Future] = {}  # 进行中的生成任务
+    
+    def configure(self, progress_max_rate: float = None, deadline: float = None):
+        if progress_max_rate is not None:
+            self.progress_max_rate = progress_max_rate
+        if deadline is not None:
+            self.deadline = deadline
     
-    async def generate_webpage(self, project_name: str, user_prompt: str, project_id: str = None) -> Dict[str, Any]:
+    async def generate_webpage(self, project_name: str, user_prompt: str, project_id: str = None, use_cache: bool = True,
+                               on_provisional: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
         """
-        生成网页内容，优先使用Claude Code，失败时使用模板
+        生成网页内容，优先使用缓存和Claude Code，失败时使用模板。
+        同一项目、相同提示词的并发请求合并为一次生成，后来者等待进行中的结果。
+        设置了deadline和on_provisional时，超时仍未完成则先用模板结果调用on_provisional，生成继续进行。
+        结果的content是Claude生成的文本，或模板渲染的UTF-8字节（直接写入文件，不再解码再编码）
         """
+        cache_key = generation_cache.make_key(
+            self._build_enhanced_prompt(project_name, user_prompt),
+            "claude-code",
+            GENERATOR_VERSION
+        )
+        flight_key = f"{project_id}:{cache_key}"
+        
+        inflight = self._inflight.get(flight_key)
+        if inflight:
+            if project_id:
+                await manager.broadcast_progress(project_id, "🔗 相同的生成任务正在进行，等待其结果...", "progress")
+            result = await asyncio.shield(inflight)
+            return dict(result, coalesced=True)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        # 生成过程中的文本片段写入输出流，供实时预览读取
+        stream = generation_streams.open(project_id) if project_id else None
+        try:
+            if self.deadline > 0 and on_provisional:
+                result = await self._generate_with_deadline(project_name, user_prompt, project_id, use_cache, cache_key, stream, on_provisional)
+            else:
+                result = await self._generate_webpage(project_name, user_prompt, project_id, use_cache, cache_key, stream)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if stream:
+                # 已推送的片段来自失败的Claude生成时，预览以最终保存的页面结束
+                stream.finish(result["content"], replace=result["generated_with"] != "claude-code")
+            return result
+        finally:
+            self._inflight.pop(flight_key, None)
+            if stream:
+                stream.finish()
+    
+    async def _generate_with_deadline(self, project_name: str, user_prompt: str, project_id: str, use_cache: bool, cache_key: str,
+                                      stream: Optional[GenerationStream],
+                                      on_provisional: Callable[[Dict[str, Any]], Awaitable[None]]) -> Dict[str, Any]:
+        """与生成同时在线程池中渲染模板，生成超过deadline时先发布模板结果作为临时版本"""
+        loop = asyncio.get_running_loop()
+        generation = asyncio.ensure_future(self._generate_webpage(project_name, user_prompt, project_id, use_cache, cache_key, stream))
+        speculative = loop.run_in_executor(None, template_generator.generate_template, project_name, user_prompt)
+        # 没有用到临时版本时也取走结果，避免未读取异常的警告
+        speculative.add_done_callback(lambda future: future.cancelled() or future.exception())
+        try:
+            done, _ = await asyncio.wait({generation}, timeout=self.deadline)
+            if not done:
+                try:
+                    content = await speculative
+                except Exception as e:
+                    print(f"Speculative template render failed: {e}")
+                else:
+                    if project_id:
+                        await manager.broadcast_progress(
+                            project_id, f"⏱️ 生成超过 {self.deadline:g} 秒，先发布模板临时版本", "progress"
+                        )
+                    try:
+                        await on_provisional({
+                            "content": content,
+                            "generated_with": "quality-template",
+                            "success": True,
+                            "provisional": True
+                        })
+                    except Exception as e:
+                        print(f"Publishing provisional version failed: {e}")
+            return await generation
+        finally:
+            generation.cancel()
+    
+    async def _generate_webpage(self, project_name: str, user_prompt: str, project_id: str, use_cache: bool, cache_key: str,
+                                stream: Optional[GenerationStream] = None) -> Dict[str, Any]:
+        if use_cache:
+            cached = await self._get_cached(cache_key)
+            if cached:
+                if project_id:
+                    await manager.broadcast_progress(project_id, "⚡ 命中生成缓存", "progress")
+                return {
+                    "content": cached["content"],
+                    "generated_with": cached["generated_with"],
+                    "success": True,
+                    "cached": True
+                }
+        
         try:
             print("Start")
-            # 优先尝试Claude Code
-            content = await self._try_claude_code_generation(project_name, user_prompt, project_id)
+            # 优先尝试Claude Code，熔断器打开时直接使用模板
+            content = await self._call_with_breaker(project_name, user_prompt, project_id, stream)
+            await self._put_cached(cache_key, content, "claude-code")
             return {
                 "content": content,
                 "generated_with": "claude-code",
@@ -46,33 +213,68 @@ class AIGenerator:
                     "fallback_reason": f"Claude: {claude_error}, Template: {template_error}"
                 }
     
-    async def _try_claude_code_generation(self, project_name: str, user_prompt: str, project_id: str = None) -> str:
+    async def _call_with_breaker(self, project_name: str, user_prompt: str, project_id: str = None,
+                                 stream: Optional[GenerationStream] = None) -> str:
+        """通过熔断器调用Claude Code，记录每次调用的结果和耗时"""
+        if not claude_breaker.allow_request():
+            raise Exception(f"Claude Code unavailable (circuit {claude_breaker.state}): {claude_breaker.last_error}")
+        
+        started = time.monotonic()
+        try:
+            content = await self._try_claude_code_generation(project_name, user_prompt, project_id, stream)
+        except asyncio.CancelledError:
+            claude_breaker.release()
+            raise
+        except ClaudeUnavailableError as e:
+            claude_breaker.record_failure(e, fatal=True)
+            raise
+        except Exception as e:
+            claude_breaker.record_failure(e)
+            raise
+        claude_breaker.record_success(time.monotonic() - started)
+        return content
+    
+    async def _get_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await generation_cache.get(cache_key)
+        except Exception as e:
+            print(f"Generation cache read failed: {e}")
+            return None
+    
+    async def _put_cached(self, cache_key: str, content: str, generated_with: str):
+        # 只缓存AI生成结果，模板后备很廉价且不应掩盖Claude的恢复
+        if not content:
+            return
+        try:
+            await generation_cache.put(cache_key, content, generated_with)
+        except Exception as e:
+            print(f"Generation cache write failed: {e}")
+    
+    async def _try_claude_code_generation(self, project_name: str, user_prompt: str, project_id: str = None,
+                                          stream: Optional[GenerationStream] = None) -> str:
         """
         尝试使用Claude Code生成内容
         """
         # 构建增强提示词
         enhanced_prompt = self._build_enhanced_prompt(project_name, user_prompt)
-        from claude_code_sdk import (
-            ClaudeSDKError,      # Base error
-            CLINotFoundError,    # Claude Code not installed
-            CLIConnectionError,  # Connection issues
-            ProcessError,        # Process failed
-            CLIJSONDecodeError,  # JSON parsing issues
-        )
-        # 方法2: 尝试使用claude-code Python包 (如果已安装)
         try:
-            return await self._call_claude_python_sdk(enhanced_prompt, project_id)
-        except CLINotFoundError:
-            print("Please install Claude Code")
+            from claude_code_sdk import (
+                CLINotFoundError,    # Claude Code not installed
+                ProcessError,        # Process failed
+                CLIJSONDecodeError,  # JSON parsing issues
+            )
+        except ImportError:
+            raise ClaudeUnavailableError("claude-code-sdk not installed. Run: pip install claude-code-sdk")
+        
+        # 方法2: 尝试使用claude-code Python包 (如果已安装)，失败时抛出异常由调用方回退到模板
+        try:
+            return await self._call_claude_python_sdk(enhanced_prompt, project_id, stream)
+        except CLINotFoundError as e:
+            raise ClaudeUnavailableError(f"Claude Code CLI not found, please install Claude Code: {e}")
         except ProcessError as e:
-            print(f"Process failed with exit code: {e.exit_code}")
+            raise Exception(f"Claude Code process failed with exit code: {e.exit_code}")
         except CLIJSONDecodeError as e:
-            print(f"Failed to parse response: {e}")
-        except Exception as e:
-            print(f"Claude Python SDK failed: {e}")
-            raise Exception("All Claude Code methods failed")
-            
-
+            raise Exception(f"Failed to parse Claude Code response: {e}")
     
     async def _call_claude_cli(self, prompt: str, project_id: str = None) -> str:
         """
@@ -84,7 +286,6 @@ class AIGenerator:
             
             # 如果有WebSocket连接，添加进度推送
             if project_id:
-                from main import manager
                 await manager.broadcast_progress(project_id, "🤖 调用Claude Code CLI...", "progress")
             
             # 执行命令，通过stdin传递提示词
@@ -115,52 +316,51 @@ class AIGenerator:
         except FileNotFoundError:
             raise Exception("Claude CLI not found. Please install claude-code CLI.")
     
-    async def _call_claude_python_sdk(self, prompt: str, project_id: str = None) -> str:
+    async def _call_claude_python_sdk(self, prompt: str, project_id: str = None, stream: Optional[GenerationStream] = None) -> str:
         """
-        通过Python SDK调用Claude Code
+        通过Python SDK调用Claude Code，生成的文本片段写入本次生成的输出流
         """
-        try:
-            # 尝试导入claude-code SDK
-            try:
-                from claude_code_sdk import query, ClaudeCodeOptions, AssistantMessage, TextBlock
-            except ImportError:
-                raise Exception("claude-code-sdk not installed. Run: pip install claude-code-sdk")
-            
-            if project_id:
-                from main import manager
-                await manager.broadcast_progress(project_id, "🤖 调用Claude Code SDK...", "progress")
+        from claude_code_sdk import query, ClaudeCodeOptions
+        
+        if project_id:
+            await manager.broadcast_progress(project_id, "🤖 调用Claude Code SDK...", "progress")
+        
+        full_response = ""
+        progress = ProgressThrottle(project_id, self.progress_max_rate)
+        options = ClaudeCodeOptions(
+            allowed_tools=["Read", "Write", "Bash"],
+            permission_mode='acceptEdits'  # auto-accept file edits
+        )
+        # 使用异步方式调用SDK
+        async for message in query(prompt=prompt,options=options):
+            if hasattr(message, 'content'):
+                if isinstance(message.content, list):
+                    for content_block in message.content:
+                        if hasattr(content_block, 'text'):
+                            full_response += content_block.text
+                            progress.add_text(content_block.text)
+                            if stream:
+                                stream.append(content_block.text)
+                else:
+                    full_response += str(message.content)
+                    progress.add_text(str(message.content))
+                    if stream:
+                        stream.append(str(message.content))
             
-            full_response = ""
-            options = ClaudeCodeOptions(
-                allowed_tools=["Read", "Write", "Bash"],
-                permission_mode='acceptEdits'  # auto-accept file edits
-            )
-            # 使用异步方式调用SDK
-            async for message in query(prompt=prompt,options=options):
-                if hasattr(message, 'content'):
-                    if isinstance(message.content, list):
-                        for content_block in message.content:
-                            if hasattr(content_block, 'text'):
-                                full_response += content_block.text
-                    else:
-                        full_response += str(message.content)
-                    
-                    # 实时推送进度
-                    if project_id and len(full_response) % 500 == 0:  # 每500字符推送一次
-                        from main import manager
-                        await manager.broadcast_progress(
-                            project_id, 
-                            f"📝 已生成 {len(full_response)} 字符...", 
-                            "progress"
-                        )
+            # 结果消息带有token用量
+            usage = getattr(message, 'usage', None)
+            if isinstance(usage, dict) and usage.get('output_tokens') is not None:
+                progress.set_tokens(usage['output_tokens'])
             
-            if full_response and len(full_response) > 100:
-                return full_response
-            else:
-                raise Exception("Claude SDK returned empty or invalid content")
-                
-        except Exception as e:
-            raise Exception(f"Claude SDK error: {str(e)}")
+            # 实时推送进度（节流）
+            await progress.maybe_emit()
+        
+        await progress.flush()
+        
+        if full_response and len(full_response) > 100:
+            return full_response
+        else:
+            raise Exception("Claude SDK returned empty or invalid content")
     
     def _build_enhanced_prompt(self, project_name: str, user_prompt: str) -> str:
         """
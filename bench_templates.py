@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import random
+import string
+import time
+
+from keyword_matcher import KeywordMatcher
+from templates import template_generator
+
+PROMPTS = [
+    "帮我做一个在线刷题系统，支持模拟考试",
+    "需要一个科学计算器工具",
+    "hello world 测试页面",
+    "一个普通的项目介绍页面，没有任何关键词",
+]
+
+
+def _random_keywords(count: int):
+    random.seed(count)
+    return [
+        "".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(4, 10)))
+        for _ in range(count)
+    ]
+
+
+def _per_call(func, rounds: int = 2000) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        func(PROMPTS[i % len(PROMPTS)])
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench(keyword_count: int):
+    keywords = _random_keywords(keyword_count) + template_generator.keywords()
+
+    matcher = KeywordMatcher()
+    for index, keyword in enumerate(keywords):
+        matcher.add(keyword, index % 50)
+    matcher.best("")  # 构建自动机
+
+    def linear_scan(prompt: str):
+        prompt_lower = prompt.lower()
+        for keyword in keywords:
+            if keyword in prompt_lower:
+                return keyword
+        return None
+
+    print(f"{len(keywords):>6} 个关键词: 自动机 {_per_call(matcher.best):6.2f} µs/次, 逐个子串查找 {_per_call(linear_scan):6.2f} µs/次")
+
+
+if __name__ == "__main__":
+    print("⏱️ 模板选择耗时（按注册的关键词数量）...")
+    for count in (0, 100, 500, 1000, 5000):
+        bench(count)
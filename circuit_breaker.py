@@ -0,0 +1,160 @@
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, Deque, Tuple
+
+
+class CircuitBreaker:
+    """
+    熔断器：统计最近window秒内调用的失败率，达到阈值后打开，打开期间直接拒绝调用；
+    冷却cooldown秒后进入半开状态，只放行一个探测调用，成功则关闭，失败则重新打开。
+    确定不可用的错误（例如未安装SDK）直接打开，无需等待失败率统计
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, window: float = 60.0, cooldown: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+
+        self.state = self.CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (时间, 是否成功)
+        self._opened_at = 0.0
+        self._probing = False
+
+        # 健康信息
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_failure_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self.last_latency: Optional[float] = None
+
+    def configure(self, failure_rate: float = None, min_calls: int = None, window: float = None, cooldown: float = None):
+        if failure_rate is not None:
+            self.failure_rate = failure_rate
+        if min_calls is not None:
+            self.min_calls = min_calls
+        if window is not None:
+            self.window = window
+        if cooldown is not None:
+            self.cooldown = cooldown
+
+    def allow_request(self) -> bool:
+        """是否放行本次调用；打开状态下只做一次时间比较"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+            print(f"Circuit breaker {self.name} half-open, probing")
+        # 半开状态同一时间只放行一个探测调用
+        if self._probing:
+            self.rejected += 1
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self, latency: float = None):
+        now = time.monotonic()
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self.last_success_at = time.time()
+        self.last_latency = latency
+        if self.state == self.HALF_OPEN:
+            print(f"Circuit breaker {self.name} closed after successful probe")
+            self.state = self.CLOSED
+            self._probing = False
+            self._outcomes.clear()
+        self._add_outcome(now, True)
+
+    def record_failure(self, error: Any = None, fatal: bool = False):
+        """记录失败；fatal表示确定不可用，直接打开"""
+        now = time.monotonic()
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.last_failure_at = time.time()
+        self.last_error = str(error) if error is not None else None
+        self._add_outcome(now, False)
+
+        if self.state == self.HALF_OPEN or fatal:
+            self._open(now)
+        elif self.state == self.CLOSED:
+            calls = len(self._outcomes)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open(now)
+
+    def release(self):
+        """调用被取消，没有结果时释放半开状态的探测名额"""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+
+    def reset(self):
+        self.state = self.CLOSED
+        self._probing = False
+        self._outcomes.clear()
+        self.consecutive_failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._expire(now)
+        calls = len(self._outcomes)
+        failures = sum(1 for _, success in self._outcomes if not success)
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = round(max(0.0, self.cooldown - (now - self._opened_at)), 3)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "window_calls": calls,
+            "window_failures": failures,
+            "failure_rate": round(failures / calls, 3) if calls else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": retry_in,
+            "total_successes": self.total_successes,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+            "last_failure_at": self._isoformat(self.last_failure_at),
+            "last_success_at": self._isoformat(self.last_success_at),
+            "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+            "config": {
+                "failure_rate": self.failure_rate,
+                "min_calls": self.min_calls,
+                "window": self.window,
+                "cooldown": self.cooldown
+            }
+        }
+
+    def _open(self, now: float):
+        if self.state != self.OPEN:
+            print(f"Circuit breaker {self.name} opened: {self.last_error}")
+        self.state = self.OPEN
+        self._opened_at = now
+        self._probing = False
+
+    def _add_outcome(self, now: float, success: bool):
+        self._outcomes.append((now, success))
+        self._expire(now)
+
+    def _expire(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    @staticmethod
+    def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+# 全局Claude Code熔断器实例
+claude_breaker = CircuitBreaker("claude-code")
@@ -0,0 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, List
+
+import aiosqlite
+
+
+class DatabasePool:
+    """
+    SQLite连接池：应用启动时创建，一个写连接（加锁串行）加若干读连接，
+    使用WAL模式让读请求不被写事务阻塞
+    """
+
+    def __init__(self):
+        self.db_path: Optional[str] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock: Optional[asyncio.Lock] = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_connections: List[aiosqlite.Connection] = []
+        self.cache_size_kb = 16384
+        self.mmap_size = 256 * 1024 * 1024
+        self.busy_timeout_ms = 5000
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self, db_path: str, readers: int = 4, cache_size_kb: int = None, mmap_size: int = None):
+        """打开写连接和读连接"""
+        self.db_path = db_path
+        if cache_size_kb is not None:
+            self.cache_size_kb = cache_size_kb
+        if mmap_size is not None:
+            self.mmap_size = mmap_size
+
+        self._writer = await self._connect()
+        # WAL模式记录在数据库文件中，写连接设置一次即可
+        async with self._writer.execute("PRAGMA journal_mode=WAL") as cursor:
+            await cursor.fetchone()
+        self._writer_lock = asyncio.Lock()
+
+        self._readers = asyncio.Queue()
+        for _ in range(max(1, readers)):
+            connection = await self._connect()
+            self._reader_connections.append(connection)
+            self._readers.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._reader_connections:
+            await connection.close()
+        self._reader_connections = []
+        self._readers = None
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(self.db_path)
+        for pragma in (
+            f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}",
+            "PRAGMA foreign_keys=ON",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA cache_size=-{int(self.cache_size_kb)}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+        ):
+            async with connection.execute(pragma) as cursor:
+                await cursor.fetchall()
+        return connection
+
+    @asynccontextmanager
+    async def reader(self):
+        """借出一个只读连接"""
+        connection = await self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put_nowait(connection)
+
+    @asynccontextmanager
+    async def writer(self):
+        """独占写连接，正常退出时提交，异常时回滚"""
+        async with self._writer_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+# 全局数据库连接池实例
+db_pool = DatabasePool()
@@ -0,0 +1,107 @@
+import hashlib
+import time
+from typing import Optional, Dict, Any
+
+import aiosqlite
+
+from database import db_pool
+
+
+class GenerationCache:
+    """
+    生成结果缓存：以增强提示词 + 生成方式 + 生成器版本的哈希为键，
+    持久化在SQLite的generation_cache表中，支持TTL过期和LRU淘汰
+    """
+
+    def __init__(self):
+        self.ttl = 7 * 24 * 3600
+        self.max_entries = 200
+        self.max_bytes = 50 * 1024 * 1024
+
+    def configure(self, ttl: int = None, max_entries: int = None, max_bytes: int = None):
+        if ttl is not None:
+            self.ttl = ttl
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return db_pool.is_open and self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(enhanced_prompt: str, mode: str, version: str) -> str:
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (version, mode, enhanced_prompt):
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，过期条目视为未命中"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT content, generated_with, created_at FROM generation_cache WHERE key = ?",
+                (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        async with db_pool.writer() as db:
+            if self.ttl > 0 and now - row[2] > self.ttl:
+                await db.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                return None
+
+            await db.execute(
+                "UPDATE generation_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (now, key)
+            )
+
+        return {"content": row[0], "generated_with": row[1]}
+
+    async def put(self, key: str, content: str, generated_with: str):
+        """写入缓存并按TTL、条目数和总大小淘汰"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        async with db_pool.writer() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, content, generated_with, size, created_at, last_accessed, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, content, generated_with, size, now, now)
+            )
+            await self._evict(db, now)
+
+    async def _evict(self, db: aiosqlite.Connection, now: float):
+        if self.ttl > 0:
+            await db.execute("DELETE FROM generation_cache WHERE created_at < ?", (now - self.ttl,))
+
+        # 按最近访问时间保留，超出条目数或总大小的部分淘汰
+        evicted = []
+        total_entries = 0
+        total_bytes = 0
+        async with db.execute("SELECT key, size FROM generation_cache ORDER BY last_accessed DESC") as cursor:
+            async for key, size in cursor:
+                total_entries += 1
+                total_bytes += size
+                if total_entries > self.max_entries or total_bytes > self.max_bytes:
+                    evicted.append((key,))
+
+        if evicted:
+            await db.executemany("DELETE FROM generation_cache WHERE key = ?", evicted)
+
+# 全局生成缓存实例
+generation_cache = GenerationCache()
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Optional, Dict, List, AsyncIterator, Union
+
+# 生成中途失败改用其他方式时，已推送的片段无法撤回，在其后追加该标记和最终保存的页面
+REPLACEMENT_MARKER = "\n<!-- 生成未完成，以下为最终保存的页面 -->\n"
+
+
+class GenerationStream:
+    """
+    单次生成的输出流：按顺序保存生成过程中收到的文本片段，
+    读取方先补发已有片段，再等待新片段直到生成结束
+    """
+
+    def __init__(self):
+        # 生成过程中的片段是文本，模板渲染的完整页面是字节，分块响应两者都可以直接发送
+        self.chunks: List[Union[str, bytes]] = []
+        self.done = False
+        # 生成结束后用最终内容替换了已推送的片段时，结束后才开始读取的读取方只读取最终内容
+        self.final: Optional[Union[str, bytes]] = None
+        self._changed = asyncio.Event()
+
+    def append(self, text: str):
+        if self.done or not text:
+            return
+        self.chunks.append(text)
+        self._notify()
+
+    def finish(self, content: Optional[Union[str, bytes]] = None, replace: bool = False):
+        """
+        结束输出流；没有收到过片段时（缓存、模板生成）把完整内容作为一个片段，
+        replace为True时（已推送的片段不是最终保存的页面）追加替换标记和完整内容
+        """
+        if self.done:
+            return
+        if content and not self.chunks:
+            self.chunks.append(content)
+        elif content and replace:
+            marker = REPLACEMENT_MARKER.encode('utf-8') if isinstance(content, bytes) else REPLACEMENT_MARKER
+            self.chunks.append(marker + content)
+            self.final = content
+        self.done = True
+        self._notify()
+
+    def _notify(self):
+        # 唤醒当前所有等待者，后续等待者使用新的Event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def iter_chunks(self) -> AsyncIterator[Union[str, bytes]]:
+        if self.done and self.final is not None:
+            yield self.final
+            return
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class GenerationStreamHub:
+    """
+    按项目保存最近一次生成的输出流，新的生成开始时替换旧的输出流。
+    被替换的输出流仍由其生成过程写入和结束，已在读取的预览不受影响
+    """
+
+    def __init__(self):
+        self.streams: Dict[str, GenerationStream] = {}
+
+    def open(self, project_id: str) -> GenerationStream:
+        stream = GenerationStream()
+        self.streams[str(project_id)] = stream
+        return stream
+
+    def get(self, project_id: str) -> Optional[GenerationStream]:
+        return self.streams.get(str(project_id))
+
+    def discard(self, project_id: str):
+        stream = self.streams.pop(str(project_id), None)
+        if stream is not None:
+            stream.finish()
+
+# 全局生成输出流实例
+generation_streams = GenerationStreamHub()
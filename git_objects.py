@@ -0,0 +1,243 @@
+import hashlib
+import os
+import struct
+import time
+import zlib
+from typing import Optional, List, Set
+
+ZERO_SHA = "0" * 40
+
+
+class UnsupportedRepositoryError(Exception):
+    """仓库状态超出进程内写入器的处理范围，需要回退到git命令行"""
+
+
+class GitObjectWriter:
+    """
+    进程内Git对象写入器：直接写入blob/tree/commit松散对象、更新引用、
+    reflog和索引文件，用于本应用只包含单个index.html的提交，
+    避免每次提交启动多个git子进程。生成的仓库与git命令行完全兼容
+    """
+
+    def __init__(self, author_name: str = "Project Generator", author_email: str = "noreply@project.local", default_branch: str = "master"):
+        self.author_name = author_name
+        self.author_email = author_email
+        self.default_branch = default_branch
+
+    def init_repo(self, repo_path: str):
+        """初始化仓库（已存在时不做任何修改）"""
+        git_dir = os.path.join(repo_path, ".git")
+        if os.path.exists(git_dir):
+            return
+
+        for sub_dir in ("objects/info", "objects/pack", "refs/heads", "refs/tags", "info"):
+            os.makedirs(os.path.join(git_dir, sub_dir), exist_ok=True)
+
+        self._write_file(os.path.join(git_dir, "HEAD"), f"ref: refs/heads/{self.default_branch}\n".encode())
+        self._write_file(os.path.join(git_dir, "config"), (
+            "[core]\n"
+            "\trepositoryformatversion = 0\n"
+            "\tfilemode = true\n"
+            "\tbare = false\n"
+            "\tlogallrefupdates = true\n"
+            "[user]\n"
+            f"\tname = {self.author_name}\n"
+            f"\temail = {self.author_email}\n"
+        ).encode('utf-8'))
+        self._write_file(os.path.join(git_dir, "description"), b"Unnamed repository; edit this file 'description' to name the repository.\n")
+
+    def commit_file(self, repo_path: str, filename: str, message: str) -> str:
+        """把工作区中的单个文件提交为新版本，返回完整提交哈希"""
+        git_dir = os.path.join(repo_path, ".git")
+        if not os.path.isdir(git_dir):
+            raise UnsupportedRepositoryError("not a git repository")
+
+        # 工作区只能包含这一个文件（info/exclude中的文件除外），否则交给git add . 处理
+        excluded = self._excluded_names(git_dir)
+        entries = [name for name in os.listdir(repo_path) if name != ".git" and name not in excluded]
+        if entries != [filename]:
+            raise UnsupportedRepositoryError(f"working tree contains {entries}")
+
+        ref = self._head_ref(git_dir)
+        parent = self.resolve_ref(git_dir, ref)
+
+        file_path = os.path.join(repo_path, filename)
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        file_stat = os.stat(file_path)
+
+        blob_sha = self.write_object(git_dir, "blob", content)
+        tree_sha = self.write_object(git_dir, "tree", b"100644 " + filename.encode('utf-8') + b"\0" + bytes.fromhex(blob_sha))
+
+        identity = f"{self.author_name} <{self.author_email}> {int(time.time())} {self._timezone()}"
+        commit_lines = [f"tree {tree_sha}"]
+        if parent:
+            commit_lines.append(f"parent {parent}")
+        commit_lines.append(f"author {identity}")
+        commit_lines.append(f"committer {identity}")
+        commit_body = "\n".join(commit_lines) + "\n\n" + message.rstrip("\n") + "\n"
+        commit_sha = self.write_object(git_dir, "commit", commit_body.encode('utf-8'))
+
+        self._update_ref(git_dir, ref, parent, commit_sha)
+        self._append_reflogs(git_dir, ref, parent, commit_sha, identity, message)
+        self._write_index(git_dir, filename, blob_sha, file_stat)
+        return commit_sha
+
+    def ensure_excluded(self, repo_path: str, names: List[str]):
+        """把文件名加入 .git/info/exclude，使其不被提交"""
+        git_dir = os.path.join(repo_path, ".git")
+        if not os.path.isdir(git_dir):
+            return
+        missing = [name for name in names if name not in self._excluded_names(git_dir)]
+        if not missing:
+            return
+
+        exclude_path = os.path.join(git_dir, "info", "exclude")
+        os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+        with open(exclude_path, 'a+', encoding='utf-8') as f:
+            f.seek(0)
+            existing = f.read()
+            if existing and not existing.endswith("\n"):
+                f.write("\n")
+            for name in missing:
+                f.write(f"/{name}\n")
+
+    def _excluded_names(self, git_dir: str) -> Set[str]:
+        """info/exclude中不含通配符的顶层文件名"""
+        names = set()
+        try:
+            with open(os.path.join(git_dir, "info", "exclude"), 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith(("#", "!")) or any(c in line for c in "*?[\\"):
+                        continue
+                    name = line[1:] if line.startswith("/") else line
+                    if name and "/" not in name:
+                        names.add(name)
+        except FileNotFoundError:
+            pass
+        return names
+
+    @staticmethod
+    def hash_object(obj_type: str, data: bytes) -> str:
+        """计算对象哈希（与git hash-object一致）"""
+        return hashlib.sha1(f"{obj_type} {len(data)}".encode() + b"\0" + data).hexdigest()
+
+    def write_object(self, git_dir: str, obj_type: str, data: bytes) -> str:
+        """写入松散对象，返回对象哈希"""
+        raw = f"{obj_type} {len(data)}".encode() + b"\0" + data
+        sha = hashlib.sha1(raw).hexdigest()
+        object_dir = os.path.join(git_dir, "objects", sha[:2])
+        object_path = os.path.join(object_dir, sha[2:])
+        if os.path.exists(object_path):
+            return sha
+
+        os.makedirs(object_dir, exist_ok=True)
+        self._write_file(object_path, zlib.compress(raw), mode=0o444)
+        return sha
+
+    def resolve_ref(self, git_dir: str, ref: str) -> Optional[str]:
+        """读取引用指向的提交，不存在时返回None"""
+        ref_path = os.path.join(git_dir, ref)
+        if os.path.exists(ref_path):
+            with open(ref_path, 'r') as f:
+                return f.read().strip() or None
+
+        packed_refs = os.path.join(git_dir, "packed-refs")
+        if os.path.exists(packed_refs):
+            with open(packed_refs, 'r') as f:
+                for line in f:
+                    if line.startswith(("#", "^")):
+                        continue
+                    parts = line.strip().split(" ", 1)
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        return None
+
+    def head_commit(self, repo_path: str) -> Optional[str]:
+        """读取HEAD指向的提交，仓库不存在或还没有提交时返回None"""
+        git_dir = os.path.join(repo_path, ".git")
+        try:
+            with open(os.path.join(git_dir, "HEAD"), 'r') as f:
+                head = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if head.startswith("ref: "):
+            return self.resolve_ref(git_dir, head[5:])
+        return head or None
+
+    def _head_ref(self, git_dir: str) -> str:
+        with open(os.path.join(git_dir, "HEAD"), 'r') as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            raise UnsupportedRepositoryError("detached HEAD")
+        return head[5:]
+
+    def _update_ref(self, git_dir: str, ref: str, old_sha: Optional[str], new_sha: str):
+        ref_path = os.path.join(git_dir, ref)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+        lock_path = ref_path + ".lock"
+        try:
+            fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            raise UnsupportedRepositoryError(f"{ref} is locked by another git process")
+
+        try:
+            # 持锁后再次确认引用未被其他进程修改
+            if self.resolve_ref(git_dir, ref) != old_sha:
+                raise UnsupportedRepositoryError(f"{ref} changed concurrently")
+            os.write(fd, f"{new_sha}\n".encode())
+            os.close(fd)
+            fd = None
+            os.replace(lock_path, ref_path)
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if os.path.exists(lock_path):
+                os.remove(lock_path)
+
+    def _append_reflogs(self, git_dir: str, ref: str, old_sha: Optional[str], new_sha: str, identity: str, message: str):
+        subject = message.split("\n", 1)[0]
+        action = "commit" if old_sha else "commit (initial)"
+        line = f"{old_sha or ZERO_SHA} {new_sha} {identity}\t{action}: {subject}\n".encode('utf-8')
+        for log_name in ("HEAD", ref):
+            log_path = os.path.join(git_dir, "logs", log_name)
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, 'ab') as f:
+                f.write(line)
+
+    def _write_index(self, git_dir: str, filename: str, blob_sha: str, file_stat: os.stat_result):
+        """写入只包含一个条目的索引文件（版本2），保证git status干净"""
+        name = filename.encode('utf-8')
+        mask = 0xFFFFFFFF
+        entry = struct.pack(
+            ">10I",
+            int(file_stat.st_ctime) & mask, (file_stat.st_ctime_ns % 1000000000) & mask,
+            int(file_stat.st_mtime) & mask, (file_stat.st_mtime_ns % 1000000000) & mask,
+            file_stat.st_dev & mask, file_stat.st_ino & mask,
+            0o100644, file_stat.st_uid & mask, file_stat.st_gid & mask,
+            file_stat.st_size & mask
+        )
+        entry += bytes.fromhex(blob_sha) + struct.pack(">H", min(len(name), 0xFFF)) + name
+        entry += b"\0" * (8 - len(entry) % 8)
+
+        data = b"DIRC" + struct.pack(">II", 2, 1) + entry
+        data += hashlib.sha1(data).digest()
+        self._write_file(os.path.join(git_dir, "index"), data)
+
+    def _write_file(self, path: str, data: bytes, mode: int = 0o644):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _timezone() -> str:
+        offset = time.localtime().tm_gmtoff
+        sign = "+" if offset >= 0 else "-"
+        offset = abs(offset) // 60
+        return f"{sign}{offset // 60:02d}{offset % 60:02d}"
+
+# 全局Git对象写入器实例
+git_object_writer = GitObjectWriter()
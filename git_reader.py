@@ -0,0 +1,281 @@
+import bisect
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple
+
+from git_objects import UnsupportedRepositoryError
+
+# 打包对象类型
+OBJ_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+
+class PackIndex:
+    """打包索引文件（.idx 版本2）：按对象哈希查找其在 .pack 文件中的偏移"""
+
+    def __init__(self, idx_path: str):
+        with open(idx_path, 'rb') as f:
+            data = f.read()
+        if data[:8] != b"\377tOc\0\0\0\2":
+            raise UnsupportedRepositoryError(f"unsupported pack index: {idx_path}")
+
+        self.count = struct.unpack(">I", data[8 + 255 * 4:8 + 256 * 4])[0]
+        shas_start = 8 + 256 * 4
+        offsets_start = shas_start + self.count * 20 + self.count * 4
+        large_start = offsets_start + self.count * 4
+
+        self.shas: List[bytes] = [data[shas_start + i * 20:shas_start + (i + 1) * 20] for i in range(self.count)]
+        self.offsets: List[int] = []
+        for i in range(self.count):
+            offset = struct.unpack(">I", data[offsets_start + i * 4:offsets_start + (i + 1) * 4])[0]
+            if offset & 0x80000000:
+                # 超过2GB的偏移存放在64位偏移表中
+                position = large_start + (offset & 0x7FFFFFFF) * 8
+                offset = struct.unpack(">Q", data[position:position + 8])[0]
+            self.offsets.append(offset)
+
+    def find(self, sha: bytes) -> Optional[int]:
+        position = bisect.bisect_left(self.shas, sha)
+        if position < self.count and self.shas[position] == sha:
+            return self.offsets[position]
+        return None
+
+
+class GitObjectReader:
+    """
+    Git对象读取器：直接从松散对象和打包文件（含OFS/REF增量）读取对象，不访问工作区，
+    解压后的对象保存在按字节数限制的LRU缓存中，可在线程池中并发调用
+    """
+
+    def __init__(self, cache_bytes: int = 16 * 1024 * 1024):
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._cached_bytes = 0
+        # .git目录 -> [(pack文件路径, 索引)]
+        self._packs: Dict[str, List[Tuple[str, PackIndex]]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, cache_bytes: int = None):
+        if cache_bytes is not None:
+            self.cache_bytes = cache_bytes
+
+    def read_object(self, git_dir: str, sha: str) -> Tuple[str, bytes]:
+        """读取对象，返回 (类型, 内容)；对象不存在时抛出UnsupportedRepositoryError"""
+        key = f"{git_dir}:{sha}"
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        obj = self._read_loose(git_dir, sha)
+        if obj is not None:
+            self._cache_put(key, obj)
+            return obj
+
+        # 打包对象只按 pack@偏移 缓存（增量链的基对象也按偏移查找），避免同一对象占用两份缓存
+        obj = self._read_packed(git_dir, sha)
+        if obj is None:
+            raise UnsupportedRepositoryError(f"object {sha} not found")
+        return obj
+
+    def read_file_at(self, repo_path: str, commit_sha: str, filename: str) -> Optional[bytes]:
+        """从提交的根目录树中读取文件内容，不访问工作区；文件不存在时返回None"""
+        blob_sha = self.file_sha_at(repo_path, commit_sha, filename)
+        if blob_sha is None:
+            return None
+        obj_type, content = self.read_object(os.path.join(repo_path, ".git"), blob_sha)
+        return content if obj_type == "blob" else None
+
+    def file_sha_at(self, repo_path: str, commit_sha: str, filename: str) -> Optional[str]:
+        """查找提交根目录树中文件的blob哈希，文件不存在时返回None"""
+        git_dir = os.path.join(repo_path, ".git")
+        obj_type, commit = self.read_object(git_dir, commit_sha)
+        if obj_type != "commit" or not commit.startswith(b"tree "):
+            raise UnsupportedRepositoryError(f"{commit_sha} is not a commit")
+
+        tree_sha = commit[5:45].decode()
+        obj_type, tree = self.read_object(git_dir, tree_sha)
+        if obj_type != "tree":
+            raise UnsupportedRepositoryError(f"{tree_sha} is not a tree")
+
+        # 树条目格式: <mode> <name>\0<20字节哈希>
+        name = filename.encode('utf-8')
+        position = 0
+        while position < len(tree):
+            space = tree.index(b" ", position)
+            nul = tree.index(b"\0", space)
+            if tree[space + 1:nul] == name:
+                return tree[nul + 1:nul + 21].hex()
+            position = nul + 21
+        return None
+
+    def forget_repo(self, git_dir: str):
+        """仓库删除后丢弃其打包索引和缓存的对象"""
+        with self._lock:
+            self._packs.pop(git_dir, None)
+            # 松散对象的键为 "<git_dir>:<sha>"，打包对象的键为 "<git_dir>/objects/pack/...@<偏移>"
+            prefixes = (f"{git_dir}:", git_dir + os.sep)
+            for key in [key for key in self._cache if key.startswith(prefixes)]:
+                self._cached_bytes -= len(self._cache.pop(key)[1])
+
+    def _read_loose(self, git_dir: str, sha: str) -> Optional[Tuple[str, bytes]]:
+        object_path = os.path.join(git_dir, "objects", sha[:2], sha[2:])
+        try:
+            with open(object_path, 'rb') as f:
+                raw = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+        header, _, data = raw.partition(b"\0")
+        return header.split(b" ", 1)[0].decode(), data
+
+    def _read_packed(self, git_dir: str, sha: str) -> Optional[Tuple[str, bytes]]:
+        binary_sha = bytes.fromhex(sha)
+        # 找不到时重新扫描一次pack目录（例如刚执行过git gc）
+        for refresh in (False, True):
+            for pack_path, index in self._pack_indexes(git_dir, refresh):
+                offset = index.find(binary_sha)
+                if offset is not None:
+                    with open(pack_path, 'rb') as pack:
+                        return self._read_pack_entry(git_dir, pack, pack_path, offset)
+        return None
+
+    def _pack_indexes(self, git_dir: str, refresh: bool) -> List[Tuple[str, PackIndex]]:
+        with self._lock:
+            packs = self._packs.get(git_dir)
+        if packs is not None and not refresh:
+            return packs
+
+        packs = []
+        pack_dir = os.path.join(git_dir, "objects", "pack")
+        if os.path.isdir(pack_dir):
+            for name in sorted(os.listdir(pack_dir)):
+                if name.endswith(".idx"):
+                    pack_path = os.path.join(pack_dir, name[:-4] + ".pack")
+                    if os.path.exists(pack_path):
+                        packs.append((pack_path, PackIndex(os.path.join(pack_dir, name))))
+        with self._lock:
+            self._packs[git_dir] = packs
+        return packs
+
+    def _read_pack_entry(self, git_dir: str, pack, pack_path: str, offset: int) -> Tuple[str, bytes]:
+        key = f"{pack_path}@{offset}"
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        pack.seek(offset)
+        header = pack.read(32)
+        byte = header[0]
+        type_id = (byte >> 4) & 7
+        position = 1
+        while byte & 0x80:
+            byte = header[position]
+            position += 1
+
+        if type_id == OBJ_OFS_DELTA:
+            byte = header[position]
+            position += 1
+            distance = byte & 0x7F
+            while byte & 0x80:
+                byte = header[position]
+                position += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7F)
+            delta = self._inflate(pack, offset + position)
+            base_type, base = self._read_pack_entry(git_dir, pack, pack_path, offset - distance)
+            obj = (base_type, self._apply_delta(base, delta))
+        elif type_id == OBJ_REF_DELTA:
+            base_sha = header[position:position + 20].hex()
+            delta = self._inflate(pack, offset + position + 20)
+            base_type, base = self.read_object(git_dir, base_sha)
+            obj = (base_type, self._apply_delta(base, delta))
+        elif type_id in OBJ_TYPES:
+            obj = (OBJ_TYPES[type_id], self._inflate(pack, offset + position))
+        else:
+            raise UnsupportedRepositoryError(f"unsupported pack object type {type_id}")
+
+        self._cache_put(key, obj)
+        return obj
+
+    @staticmethod
+    def _inflate(pack, position: int) -> bytes:
+        pack.seek(position)
+        decompressor = zlib.decompressobj()
+        chunks = []
+        while not decompressor.eof:
+            data = pack.read(65536)
+            if not data:
+                raise UnsupportedRepositoryError("truncated pack file")
+            chunks.append(decompressor.decompress(data))
+        return b"".join(chunks)
+
+    @staticmethod
+    def _apply_delta(base: bytes, delta: bytes) -> bytes:
+        def read_size(position: int) -> Tuple[int, int]:
+            size = shift = 0
+            while True:
+                byte = delta[position]
+                position += 1
+                size |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    return size, position
+
+        base_size, position = read_size(0)
+        result_size, position = read_size(position)
+        if base_size != len(base):
+            raise UnsupportedRepositoryError("delta base size mismatch")
+
+        result = bytearray()
+        while position < len(delta):
+            opcode = delta[position]
+            position += 1
+            if opcode & 0x80:
+                # 从基础对象复制：低4位标记偏移字节，高3位标记长度字节
+                copy_offset = copy_size = 0
+                for i in range(4):
+                    if opcode & (1 << i):
+                        copy_offset |= delta[position] << (8 * i)
+                        position += 1
+                for i in range(3):
+                    if opcode & (0x10 << i):
+                        copy_size |= delta[position] << (8 * i)
+                        position += 1
+                result += base[copy_offset:copy_offset + (copy_size or 0x10000)]
+            elif opcode:
+                # 插入增量中的新数据
+                result += delta[position:position + opcode]
+                position += opcode
+            else:
+                raise UnsupportedRepositoryError("invalid delta opcode")
+
+        if len(result) != result_size:
+            raise UnsupportedRepositoryError("delta result size mismatch")
+        return bytes(result)
+
+    def _cache_get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            obj = self._cache.get(key)
+            if obj is not None:
+                self._cache.move_to_end(key)
+            return obj
+
+    def _cache_put(self, key: str, obj: Tuple[str, bytes]):
+        size = len(obj[1])
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = obj
+            self._cached_bytes += size
+            # 按最近使用顺序淘汰
+            while self._cached_bytes > self.cache_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted[1])
+
+# 全局Git对象读取器实例
+git_object_reader = GitObjectReader()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+from typing import Optional, Dict, List
+
+
+class GitRunner:
+    """
+    异步Git命令执行层：子进程不阻塞事件循环，全局并发数受限，
+    每个仓库一把锁用于串行化写操作，所有命令带超时
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeout: float = 30):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._repo_locks: Dict[str, asyncio.Lock] = {}
+
+    def configure(self, max_concurrency: int = None, timeout: float = None):
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+        if timeout is not None:
+            self.timeout = timeout
+        self._semaphore = None
+
+    def repo_lock(self, repo_path: str) -> asyncio.Lock:
+        """获取仓库锁，同一仓库的写操作（写文件、add、commit）需在锁内执行"""
+        key = os.path.realpath(repo_path)
+        lock = self._repo_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._repo_locks[key] = lock
+        return lock
+
+    def forget_repo(self, repo_path: str):
+        """仓库删除后释放对应的锁"""
+        self._repo_locks.pop(os.path.realpath(repo_path), None)
+
+    async def run(self, args: List[str], cwd: str, timeout: float = None) -> str:
+        """执行Git命令并返回标准输出"""
+        return (await self.run_bytes(args, cwd, timeout)).decode('utf-8', errors='replace')
+
+    async def run_bytes(self, args: List[str], cwd: str, timeout: float = None) -> bytes:
+        """执行Git命令并返回原始字节输出（用于读取文件内容，避免解码替换非UTF-8字节）"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        timeout = self.timeout if timeout is None else timeout
+
+        async with self._semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *args,
+                    cwd=cwd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except FileNotFoundError:
+                # 工作目录不存在时同样抛出FileNotFoundError，只有找不到可执行文件才提示安装git
+                if not os.path.isdir(cwd):
+                    raise Exception(f"Git working directory does not exist: {cwd}")
+                raise Exception("Git not found. Please install git.")
+
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise Exception(f"Git command timed out after {timeout}s: {' '.join(args)}")
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+
+        if process.returncode != 0:
+            raise Exception(f"Git command failed: {stderr.decode('utf-8', errors='replace')}")
+
+        return stdout
+
+# 全局Git执行器实例
+git_runner = GitRunner()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Optional, Dict, Any, Callable, Awaitable, List, Set
+
+from database import db_pool
+
+
+class GenerationJobQueue:
+    """
+    页面生成任务队列：HTTP请求只负责入队，由固定数量的后台worker执行生成，
+    任务状态持久化在SQLite的jobs表中。
+    认领的任务记录归属进程并定期续约，多个进程共享数据库时，
+    只有归属进程退出（租约过期）的运行中任务才会重新排队
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.handler: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None
+        # 本进程的标识，每次启动不同
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease = 60.0  # 租约时长（秒），每 lease/3 秒续约一次
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._queued: Set[str] = set()  # 已在本进程队列中的任务
+
+    async def start(self, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], worker_count: int = 2, lease: float = None):
+        """启动worker，并恢复已退出的进程未完成的任务"""
+        self.handler = handler
+        self.queue = asyncio.Queue()
+        self._queued = set()
+        if lease is not None:
+            self.lease = lease
+
+        await self._requeue_expired()
+        pending = len(self._queued)
+
+        self.workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(max(1, worker_count))
+        ]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        print(f"Generation job queue started with {len(self.workers)} workers, {pending} pending jobs")
+
+    async def stop(self):
+        """停止所有worker，本进程运行中的任务立即重新排队，由其他进程或下次启动执行"""
+        tasks = self.workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self._heartbeat = None
+
+        async with db_pool.writer() as db:
+            await db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND owner = ?",
+                (self.owner,)
+            )
+
+    async def _requeue_expired(self):
+        """把租约过期（归属进程已退出）的运行中任务重新排队，并把尚未在本进程队列中的排队任务放入队列"""
+        async with db_pool.writer() as db:
+            # 没有心跳的旧任务（迁移前的记录）同样视为过期
+            cursor = await db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (time.time() - self.lease,)
+            )
+            if cursor.rowcount > 0:
+                print(f"Requeued {cursor.rowcount} jobs whose worker process stopped heartbeating")
+            async with db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at") as cursor:
+                pending = await cursor.fetchall()
+
+        # 已退出进程入队但未认领的任务也由本进程接手；同一任务可能在多个进程的队列中，认领时只有一个进程能成功
+        for row in pending:
+            self._put(row[0])
+
+    def _put(self, job_id: str):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            self.queue.put_nowait(job_id)
+
+    async def _heartbeat_loop(self):
+        """为本进程运行中的任务续约，并接手租约过期的任务"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                async with db_pool.writer() as db:
+                    await db.execute(
+                        "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                        (time.time(), self.owner)
+                    )
+                await self._requeue_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Generation job heartbeat failed: {e}")
+
+    async def enqueue(self, project_id: int, prompt: str, options: Dict[str, Any] = None) -> Dict[str, Any]:
+        """创建任务并加入队列，立即返回任务信息"""
+        job_id = str(uuid.uuid4())
+        async with db_pool.writer() as db:
+            await db.execute(
+                "INSERT INTO jobs (id, project_id, prompt, options, status) VALUES (?, ?, ?, ?, 'queued')",
+                (job_id, project_id, prompt, json.dumps(options or {}))
+            )
+
+        self._put(job_id)
+        return await self.get_job(job_id)
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务状态"""
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT id, project_id, prompt, options, status, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ) as cursor:
+                job = await cursor.fetchone()
+
+        if not job:
+            return None
+
+        return {
+            "id": job[0],
+            "project_id": job[1],
+            "prompt": job[2],
+            "options": json.loads(job[3]) if job[3] else {},
+            "status": job[4],
+            "result": json.loads(job[5]) if job[5] else None,
+            "error": job[6],
+            "created_at": job[7],
+            "started_at": job[8],
+            "finished_at": job[9],
+            "queue_size": self.queue.qsize() if self.queue else 0
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self.queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._run_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Generation worker {index} failed on job {job_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        # 只认领仍在排队的任务，多个进程共享数据库时同一任务只执行一次
+        async with db_pool.writer() as db:
+            cursor = await db.execute(
+                "UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP, owner = ?, heartbeat_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (self.owner, time.time(), job_id)
+            )
+            claimed = cursor.rowcount > 0
+        if not claimed:
+            return
+
+        job = await self.get_job(job_id)
+        if not job:
+            return
+
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._finish_job(job_id, "failed", error=str(e))
+            return
+
+        await self._finish_job(job_id, "succeeded", result=result)
+
+    async def _finish_job(self, job_id: str, status: str, result: Dict[str, Any] = None, error: str = None):
+        async with db_pool.writer() as db:
+            # 租约已被其他进程接手时不覆盖其状态
+            await db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ? AND owner = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id, self.owner)
+            )
+
+# 全局任务队列实例
+job_queue = GenerationJobQueue()
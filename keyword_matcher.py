@@ -0,0 +1,96 @@
+from collections import deque
+from typing import Any, Optional, Dict, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器（Aho-Corasick自动机）：一次扫描找出文本中出现的全部关键词，
+    耗时只与文本长度和匹配数有关，与注册的关键词数量无关。
+    每个关键词关联一个目标和权重，按目标累加命中关键词的权重打分（不区分大小写）
+    """
+
+    def __init__(self):
+        self.keywords: List[Tuple[str, Any, float]] = []
+        # 目标 -> 注册顺序，用于得分相同时的优先级
+        self._target_order: Dict[Any, int] = {}
+        # 自动机：状态 -> {字符: 状态}、失败转移、以该状态结尾的关键词序号（含失败链上的）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own_outputs: List[List[int]] = [[]]
+        self._outputs: List[List[int]] = [[]]
+        self._built = True
+
+    def add(self, keyword: str, target: Any, weight: float = 1.0):
+        keyword = keyword.lower()
+        if not keyword:
+            raise ValueError("keyword must not be empty")
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._own_outputs.append([])
+            state = next_state
+        self._own_outputs[state].append(len(self.keywords))
+        self.keywords.append((keyword, target, weight))
+        self._target_order.setdefault(target, len(self._target_order))
+        self._built = False
+
+    def _build(self):
+        """按广度优先计算失败转移，并把失败状态的输出合并到当前状态"""
+        self._outputs = [list(outputs) for outputs in self._own_outputs]
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # 失败状态更浅，已先出队处理完毕
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def find_all(self, text: str) -> List[Tuple[int, int]]:
+        """返回所有命中 (关键词序号, 结束位置)，按结束位置排序"""
+        if not self._built:
+            self._build()
+
+        matches = []
+        state = 0
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                matches.append((index, position))
+        return matches
+
+    def scores(self, text: str) -> Dict[Any, float]:
+        """按目标累加命中关键词的权重，同一关键词多次出现只计一次"""
+        scores: Dict[Any, float] = {}
+        seen = set()
+        for index, _ in self.find_all(text):
+            if index in seen:
+                continue
+            seen.add(index)
+            _, target, weight = self.keywords[index]
+            scores[target] = scores.get(target, 0.0) + weight
+        return scores
+
+    def best(self, text: str) -> Optional[Any]:
+        """得分最高的目标，得分相同时取最先注册的目标；没有命中时返回None"""
+        scores = self.scores(text)
+        if not scores:
+            return None
+        return max(scores, key=lambda target: (scores[target], -self._target_order[target]))
@@ -1,20 +1,32 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request, Response, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import aiosqlite
+import sqlite3
 import os
 import asyncio
 import json
-import uuid
-from datetime import datetime
-from typing import Optional, List
-import subprocess
+from datetime import datetime, timezone
+from typing import Optional, List, Union
+import shlex
 import shutil
-from templates import template_generator
+import difflib
+from templates import template_generator, TEMPLATES_DIR
 from ai_generator import ai_generator
+from circuit_breaker import claude_breaker
+from job_queue import job_queue
+from generation_cache import generation_cache
+from generation_stream import generation_streams
+from git_runner import git_runner
+from git_objects import git_object_writer, UnsupportedRepositoryError
+from git_reader import git_object_reader
+from database import db_pool
+from progress import manager, create_broadcast_backend
+from page_cache import page_cache, CachedPage, negotiate_encoding, write_page, sync_directory
+from migrations import apply_migrations
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -23,57 +35,88 @@ load_dotenv()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时执行
+    await db_pool.open(
+        DATABASE_PATH,
+        readers=DB_READERS,
+        cache_size_kb=SQLITE_CACHE_SIZE_KB,
+        mmap_size=SQLITE_MMAP_SIZE
+    )
     await init_database()
+    manager.configure(
+        max_queue=WS_SEND_QUEUE_SIZE,
+        policy=WS_SLOW_CONSUMER_POLICY,
+        send_timeout=WS_SEND_TIMEOUT,
+        history_size=PROGRESS_HISTORY_SIZE,
+        backend=create_broadcast_backend(
+            BROADCAST_BACKEND,
+            poll_interval=PROGRESS_POLL_INTERVAL,
+            retention=PROGRESS_EVENTS_RETENTION
+        )
+    )
+    await manager.start()
+    git_runner.configure(max_concurrency=GIT_MAX_CONCURRENCY, timeout=GIT_TIMEOUT)
+    git_object_reader.configure(cache_bytes=GIT_OBJECT_CACHE_BYTES)
+    template_generator.configure(templates_dir=PAGE_TEMPLATES_DIR)
+    await backfill_versions_if_empty()
+    generation_cache.configure(
+        ttl=GENERATION_CACHE_TTL,
+        max_entries=GENERATION_CACHE_MAX_ENTRIES,
+        max_bytes=GENERATION_CACHE_MAX_BYTES
+    )
+    ai_generator.configure(progress_max_rate=PROGRESS_MAX_RATE, deadline=GENERATION_DEADLINE)
+    claude_breaker.configure(
+        failure_rate=CLAUDE_BREAKER_FAILURE_RATE,
+        min_calls=CLAUDE_BREAKER_MIN_CALLS,
+        window=CLAUDE_BREAKER_WINDOW,
+        cooldown=CLAUDE_BREAKER_COOLDOWN
+    )
+    page_cache.configure(max_bytes=PAGE_CACHE_MAX_BYTES, check_interval=PAGE_CACHE_CHECK_INTERVAL)
+    await job_queue.start(run_page_generation, GENERATION_WORKERS, lease=JOB_LEASE_SECONDS)
     yield
-    # 关闭时执行（如果需要清理资源）
+    # 关闭时执行
+    await job_queue.stop()
+    await manager.stop()
+    await db_pool.close()
 
 app = FastAPI(title="AI项目管理系统", lifespan=lifespan)
 
 # 配置常量
 DATABASE_PATH = os.getenv("DATABASE_PATH", "projects.db")
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
 PROJECTS_DIR = os.getenv("PROJECTS_DIR", "projects")
 PORT = int(os.getenv("PORT", "3000"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest / coalesce / disconnect
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+PROGRESS_HISTORY_SIZE = int(os.getenv("PROGRESS_HISTORY_SIZE", "50"))  # 每个项目保留的最近进度事件数
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "local")  # local（单进程）/ sqlite（多worker进程）
+PROGRESS_POLL_INTERVAL = float(os.getenv("PROGRESS_POLL_INTERVAL", "0.1"))  # sqlite后端轮询间隔（秒）
+PROGRESS_EVENTS_RETENTION = int(os.getenv("PROGRESS_EVENTS_RETENTION", "10000"))  # sqlite后端保留的事件数
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))  # 运行中任务的租约，归属进程超过该时间没有续约时任务重新排队
+GIT_MAX_CONCURRENCY = int(os.getenv("GIT_MAX_CONCURRENCY", "4"))
+GIT_TIMEOUT = float(os.getenv("GIT_TIMEOUT", "30"))
+GIT_IN_PROCESS = os.getenv("GIT_IN_PROCESS", "true").lower() in ("1", "true", "yes")
+GIT_OBJECT_CACHE_BYTES = int(os.getenv("GIT_OBJECT_CACHE_BYTES", str(16 * 1024 * 1024)))  # 解压后Git对象的LRU缓存大小
+PAGE_TEMPLATES_DIR = os.getenv("PAGE_TEMPLATES_DIR", TEMPLATES_DIR)  # 后备模板包目录
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "200"))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+PROGRESS_MAX_RATE = float(os.getenv("PROGRESS_MAX_RATE", "2"))  # 生成进度每秒最多推送次数
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "0"))  # 生成超过该秒数时先发布模板临时版本（0表示关闭）
+# Claude Code熔断器：window秒内至少min_calls次调用且失败率达到阈值时打开，cooldown秒后放行一次探测
+CLAUDE_BREAKER_FAILURE_RATE = float(os.getenv("CLAUDE_BREAKER_FAILURE_RATE", "0.5"))
+CLAUDE_BREAKER_MIN_CALLS = int(os.getenv("CLAUDE_BREAKER_MIN_CALLS", "5"))
+CLAUDE_BREAKER_WINDOW = float(os.getenv("CLAUDE_BREAKER_WINDOW", "60"))
+CLAUDE_BREAKER_COOLDOWN = float(os.getenv("CLAUDE_BREAKER_COOLDOWN", "30"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+PAGE_CACHE_CHECK_INTERVAL = float(os.getenv("PAGE_CACHE_CHECK_INTERVAL", "0"))  # 多worker部署时定期检查页面文件（秒）
 
 # 确保项目目录存在
 os.makedirs(PROJECTS_DIR, exist_ok=True)
 
-# WebSocket连接管理
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict = {}
-    
-    async def connect(self, websocket: WebSocket, project_id: str = None):
-        await websocket.accept()
-        connection_id = str(uuid.uuid4())
-        self.active_connections[connection_id] = {
-            'websocket': websocket,
-            'project_id': project_id
-        }
-        return connection_id
-    
-    def disconnect(self, connection_id: str):
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
-    
-    async def broadcast_progress(self, project_id: str, message: str, msg_type: str = "progress"):
-        progress_data = {
-            "type": msg_type,
-            "projectId": project_id,
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # 广播给订阅该项目的所有连接
-        for conn_id, conn_data in self.active_connections.items():
-            if conn_data['project_id'] == project_id:
-                try:
-                    await conn_data['websocket'].send_text(json.dumps(progress_data))
-                except:
-                    # 连接已断开，移除
-                    self.disconnect(conn_id)
-
-manager = ConnectionManager()
-
 # 数据模型
 class ProjectCreate(BaseModel):
     name: str
@@ -84,80 +127,167 @@ class ProjectUpdate(BaseModel):
 
 class PageCreate(BaseModel):
     prompt: Optional[str] = None
+    no_cache: bool = False  # 跳过生成缓存，强制重新生成
 
 # 数据库初始化
 async def init_database():
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                keyword TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS pages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                project_id INTEGER,
-                url_id TEXT NOT NULL,
-                version_hash TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (project_id) REFERENCES projects (id)
-            )
-        """)
-        await db.commit()
+    async with db_pool.writer() as db:
+        await apply_migrations(db)
+    await ensure_project_directories()
 
-# Git辅助函数
-async def exec_git_command(command: str, cwd: str) -> str:
-    """执行Git命令"""
+async def ensure_project_directories():
+    """
+    为缺少目录的项目创建目录并初始化Git仓库。迁移2会把重名项目改名为 name-id，
+    改名后的项目没有对应目录（原来与同名项目共用一个目录，历史版本留在原目录中）
+    """
+    async with db_pool.reader() as db:
+        async with db.execute("SELECT name FROM projects") as cursor:
+            names = [row[0] for row in await cursor.fetchall()]
+    for name in names:
+        project_path = os.path.join(PROJECTS_DIR, name)
+        if not os.path.isdir(project_path):
+            print(f"Creating missing project directory: {project_path}")
+            await ensure_project_directory(project_path)
+
+async def ensure_project_directory(project_path: str):
+    """创建项目目录并初始化Git仓库（已存在时不做任何修改）"""
+    os.makedirs(project_path, exist_ok=True)
     try:
-        result = subprocess.run(
-            command.split(),
-            cwd=cwd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise Exception(f"Git command failed: {e.stderr}")
+        await init_git_repo(project_path)
+    except Exception as e:
+        print(f"Git initialization failed: {e}")
+
+# Git辅助函数
+async def exec_git_command(command: Union[str, List[str]], cwd: str) -> str:
+    """执行Git命令（异步子进程，不阻塞事件循环）"""
+    args = shlex.split(command) if isinstance(command, str) else list(command)
+    return await git_runner.run(args, cwd)
 
 async def init_git_repo(project_path: str):
     """初始化Git仓库"""
-    await exec_git_command("git init", project_path)
-    await exec_git_command("git config user.name 'Project Generator'", project_path)
-    await exec_git_command("git config user.email 'noreply@project.local'", project_path)
+    async with git_runner.repo_lock(project_path):
+        if GIT_IN_PROCESS:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, git_object_writer.init_repo, project_path)
+                return
+            except Exception as e:
+                print(f"In-process git init failed, falling back to git CLI: {e}")
+        
+        await exec_git_command("git init", project_path)
+        await exec_git_command("git config user.name 'Project Generator'", project_path)
+        await exec_git_command("git config user.email 'noreply@project.local'", project_path)
 
-async def commit_to_git(project_path: str, message: str):
-    """提交到Git"""
+async def commit_to_git(project_path: str, message: str) -> str:
+    """提交到Git并返回完整提交哈希（调用方需持有该仓库的repo_lock）"""
+    if GIT_IN_PROCESS:
+        # 单文件提交直接写入Git对象，无需启动git进程
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, git_object_writer.commit_file, project_path, "index.html", message
+            )
+        except UnsupportedRepositoryError as e:
+            print(f"In-process commit not applicable, falling back to git CLI: {e}")
+    
     await exec_git_command("git add .", project_path)
-    await exec_git_command(f"git commit -m '{message}'", project_path)
+    # 重新生成的内容可能与上一版本相同，仍然记录为一个新版本
+    await exec_git_command(["git", "commit", "--allow-empty", "-m", message], project_path)
+    hash_output = await exec_git_command("git rev-parse HEAD", project_path)
+    return hash_output.strip()
 
-async def get_git_versions(project_path: str) -> List[dict]:
-    """获取Git版本历史"""
-    try:
-        output = await exec_git_command("git log --oneline --reverse", project_path)
-        versions = []
-        for index, line in enumerate(output.strip().split('\n')):
-            if line:
-                parts = line.split(' ', 1)
-                hash_val = parts[0]
-                message = parts[1] if len(parts) > 1 else ""
-                versions.append({
-                    "hash": hash_val,
-                    "message": message,
-                    "version": index + 1,
-                    "isCurrent": False
-                })
-        
-        # 标记当前版本
-        if versions:
-            versions[-1]["isCurrent"] = True
+async def read_git_log(project_path: str) -> List[dict]:
+    """从Git历史读取提交列表（从旧到新），仅用于重建版本索引"""
+    output = await exec_git_command(["git", "log", "--reverse", "--format=%H%x09%ct%x09%s"], project_path)
+    commits = []
+    for line in output.strip().split('\n'):
+        if line:
+            parts = line.split('\t', 2)
+            commits.append({
+                "commit_hash": parts[0],
+                "created_at": datetime.utcfromtimestamp(int(parts[1])).strftime('%Y-%m-%d %H:%M:%S'),
+                "message": parts[2] if len(parts) > 2 else ""
+            })
+    return commits
+
+# 版本索引
+async def record_version(db: aiosqlite.Connection, project_id: int, commit_hash: str, message: str, generated_with: str = None) -> int:
+    """提交完成后记录版本，返回版本序号（调用方负责commit）"""
+    cursor = await db.execute(
+        """
+        INSERT INTO versions (project_id, ordinal, hash, commit_hash, message, generated_with)
+        SELECT ?, COALESCE(MAX(ordinal), 0) + 1, ?, ?, ?, ? FROM versions WHERE project_id = ?
+        """,
+        (project_id, commit_hash[:7], commit_hash, message, generated_with, project_id)
+    )
+    async with db.execute("SELECT ordinal FROM versions WHERE id = ?", (cursor.lastrowid,)) as cursor:
+        return (await cursor.fetchone())[0]
+
+async def get_versions(db: aiosqlite.Connection, project_id: int) -> List[dict]:
+    """获取版本历史"""
+    async with db.execute(
+        "SELECT hash, message, ordinal, generated_with, created_at FROM versions WHERE project_id = ? ORDER BY ordinal",
+        (project_id,)
+    ) as cursor:
+        rows = await cursor.fetchall()
+    
+    versions = [
+        {
+            "hash": row[0],
+            "message": row[1],
+            "version": row[2],
+            "generated_with": row[3],
+            "created_at": row[4],
+            "url": f"/page/{project_id}/{row[2]}",
+            "isCurrent": False
+        }
+        for row in rows
+    ]
+    
+    # 标记当前版本
+    if versions:
+        versions[-1]["isCurrent"] = True
+    
+    return versions
+
+async def rebuild_versions(project_id: int = None) -> int:
+    """根据各项目的Git历史重建版本索引，返回写入的版本数"""
+    total = 0
+    async with db_pool.reader() as db:
+        if project_id is None:
+            query, params = "SELECT id, name FROM projects", ()
+        else:
+            query, params = "SELECT id, name FROM projects WHERE id = ?", (project_id,)
+        async with db.execute(query, params) as cursor:
+            projects = await cursor.fetchall()
+    
+    for pid, name in projects:
+        project_path = os.path.join(PROJECTS_DIR, name)
+        try:
+            commits = await read_git_log(project_path)
+        except Exception as e:
+            print(f"Skip rebuilding versions for {name}: {e}")
+            continue
         
-        return versions
-    except:
-        return []
+        async with db_pool.writer() as db:
+            await db.execute("DELETE FROM versions WHERE project_id = ?", (pid,))
+            await db.executemany(
+                "INSERT INTO versions (project_id, ordinal, hash, commit_hash, message, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (pid, index + 1, commit["commit_hash"][:7], commit["commit_hash"], commit["message"], commit["created_at"])
+                    for index, commit in enumerate(commits)
+                ]
+            )
+        total += len(commits)
+    
+    return total
+
+async def backfill_versions_if_empty():
+    """版本索引为空但已有项目时（从旧版本升级），自动从Git历史回填一次"""
+    async with db_pool.reader() as db:
+        async with db.execute("SELECT EXISTS (SELECT 1 FROM versions), EXISTS (SELECT 1 FROM projects)") as cursor:
+            has_versions, has_projects = await cursor.fetchone()
+    if has_projects and not has_versions:
+        count = await rebuild_versions()
+        print(f"Backfilled {count} versions from git history")
 
 # 静态文件服务（如果目录存在）
 if os.path.exists("static"):
@@ -175,14 +305,18 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 if message.get("type") == "subscribe":
                     project_id = message.get("projectId")
-                    if connection_id in manager.active_connections:
-                        manager.active_connections[connection_id]['project_id'] = project_id
-                        # 发送订阅确认
-                        await websocket.send_text(json.dumps({
+                    since = message.get("since")
+                    if manager.subscribe(connection_id, project_id):
+                        ack = {
                             "type": "subscribed",
                             "projectId": project_id,
-                            "message": f"已订阅项目 {project_id} 的进度推送"
-                        }))
+                            "message": f"已订阅项目 {project_id} 的进度推送",
+                            "seq": manager.sequences.get(str(project_id), 0)
+                        }
+                        if isinstance(since, int) and project_id is not None:
+                            # 先补发since之后的历史事件，确认消息中带上补发数量和历史是否已被截断
+                            ack.update(manager.replay(connection_id, project_id, since))
+                        manager.send(connection_id, ack)
                         
             except json.JSONDecodeError:
                 # 忽略非JSON消息
@@ -200,7 +334,7 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.get("/api/projects")
 async def get_projects():
     """获取项目列表"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.reader() as db:
         async with db.execute("SELECT * FROM projects ORDER BY created_at DESC") as cursor:
             projects = await cursor.fetchall()
             return [
@@ -219,35 +353,32 @@ async def create_project(project: ProjectCreate):
     if not project.name or not project.keyword:
         raise HTTPException(status_code=400, detail="Project name and keyword are required")
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO projects (name, keyword) VALUES (?, ?)",
-            (project.name, project.keyword)
-        )
-        project_id = cursor.lastrowid
-        await db.commit()
-        
-        # 创建项目目录
-        project_path = os.path.join(PROJECTS_DIR, project.name)
-        os.makedirs(project_path, exist_ok=True)
-        
-        # 初始化Git仓库
-        try:
-            await init_git_repo(project_path)
-        except Exception as e:
-            print(f"Git initialization failed: {e}")
-        
-        return {
-            "id": project_id,
-            "name": project.name,
-            "keyword": project.keyword,
-            "defaultPage": f"http://localhost:{PORT}/page/index"
-        }
+    try:
+        async with db_pool.writer() as db:
+            cursor = await db.execute(
+                "INSERT INTO projects (name, keyword) VALUES (?, ?)",
+                (project.name, project.keyword)
+            )
+            project_id = cursor.lastrowid
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="Project name already exists")
+    page_cache.forget_latest_project()
+    page_cache.set_route(project_id, project.name)
+    
+    # 创建项目目录并初始化Git仓库
+    await ensure_project_directory(os.path.join(PROJECTS_DIR, project.name))
+    
+    return {
+        "id": project_id,
+        "name": project.name,
+        "keyword": project.keyword,
+        "defaultPage": f"http://localhost:{PORT}/page/{project_id}"
+    }
 
 @app.put("/api/projects/{project_id}")
 async def update_project(project_id: int, project: ProjectUpdate):
     """更新项目"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.writer() as db:
         # 检查项目是否存在
         async with db.execute("SELECT * FROM projects WHERE id = ?", (project_id,)) as cursor:
             existing_project = await cursor.fetchone()
@@ -259,7 +390,6 @@ async def update_project(project_id: int, project: ProjectUpdate):
             "UPDATE projects SET keyword = ? WHERE id = ?",
             (project.keyword, project_id)
         )
-        await db.commit()
         
         return {
             "id": project_id,
@@ -271,185 +401,453 @@ async def update_project(project_id: int, project: ProjectUpdate):
 @app.delete("/api/projects/{project_id}")
 async def delete_project(project_id: int):
     """删除项目"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.writer() as db:
         # 检查项目是否存在
         async with db.execute("SELECT name FROM projects WHERE id = ?", (project_id,)) as cursor:
             project = await cursor.fetchone()
             if not project:
                 raise HTTPException(status_code=404, detail="Project not found")
         
-        # 删除数据库记录
-        await db.execute("DELETE FROM pages WHERE project_id = ?", (project_id,))
+        # 删除数据库记录（页面、版本、任务通过外键级联删除）
         await db.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-        await db.commit()
-        
-        # 删除项目目录
-        project_path = os.path.join(PROJECTS_DIR, project[0])
+    
+    # 删除项目目录
+    project_path = os.path.join(PROJECTS_DIR, project[0])
+    async with git_runner.repo_lock(project_path):
         if os.path.exists(project_path):
             shutil.rmtree(project_path)
-        
-        return {"message": "Project deleted successfully"}
+    git_runner.forget_repo(project_path)
+    git_object_reader.forget_repo(os.path.join(project_path, ".git"))
+    generation_streams.discard(str(project_id))
+    manager.forget_project(str(project_id))
+    page_cache.invalidate_project(project_id)
+    page_cache.forget_latest_project()
+    
+    return {"message": "Project deleted successfully"}
 
 @app.get("/api/projects/{project_id}/pages")
-async def get_project_pages(project_id: int):
-    """获取项目页面列表"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_project_pages(
+    project_id: int,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[int] = None
+):
+    """获取项目页面列表（按页面ID倒序游标分页，下一页游标通过X-Next-Cursor响应头返回）"""
+    async with db_pool.reader() as db:
         # 检查项目是否存在
         async with db.execute("SELECT name FROM projects WHERE id = ?", (project_id,)) as cursor:
             project = await cursor.fetchone()
             if not project:
                 raise HTTPException(status_code=404, detail="Project not found")
         
-        # 获取Git版本历史
-        project_path = os.path.join(PROJECTS_DIR, project[0])
-        versions = await get_git_versions(project_path)
-        
-        # 获取页面记录
+        # 页面记录与版本索引按短哈希关联（短哈希可能重复，取最新的一条），多取一条用于判断是否还有下一页
+        where, params = "p.project_id = ?", [project_id]
+        if after is not None:
+            where += " AND p.id < ?"
+            params.append(after)
         async with db.execute(
-            "SELECT * FROM pages WHERE project_id = ? ORDER BY created_at DESC",
-            (project_id,)
+            f"""
+            SELECT p.id, p.project_id, p.url_id, p.version_hash, p.created_at, v.ordinal, v.message
+            FROM pages p
+            LEFT JOIN versions v ON v.id = (
+                SELECT MAX(id) FROM versions WHERE project_id = p.project_id AND hash = p.version_hash
+            )
+            WHERE {where}
+            ORDER BY p.id DESC
+            LIMIT ?
+            """,
+            (*params, limit + 1)
         ) as cursor:
             pages = await cursor.fetchall()
-            
-            # 合并版本信息
-            result = []
-            for page in pages:
-                page_data = {
-                    "id": page[0],
-                    "project_id": page[1],
-                    "url_id": page[2],
-                    "version_hash": page[3],
-                    "created_at": page[4]
-                }
-                
-                # 查找对应的版本信息
-                for version in versions:
-                    if version["hash"] == page[3]:
-                        page_data.update({
-                            "version": version["version"],
-                            "message": version["message"]
-                        })
-                        break
-                
-                result.append(page_data)
-            
-            return result
+        
+        result = []
+        for page in pages[:limit]:
+            page_data = {
+                "id": page[0],
+                "project_id": page[1],
+                "url_id": page[2],
+                "version_hash": page[3],
+                "created_at": page[4]
+            }
+            if page[5] is not None:
+                page_data.update({
+                    "version": page[5],
+                    "message": page[6]
+                })
+            result.append(page_data)
+        
+        if len(pages) > limit:
+            response.headers["X-Next-Cursor"] = str(result[-1]["id"])
+        
+        return result
 
-@app.post("/api/projects/{project_id}/pages")
+@app.post("/api/projects/{project_id}/pages", status_code=202)
 async def create_page(project_id: int, page: PageCreate):
-    """生成新页面"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    """生成新页面（加入后台生成队列，立即返回任务ID）"""
+    async with db_pool.reader() as db:
         # 检查项目是否存在
         async with db.execute("SELECT name, keyword FROM projects WHERE id = ?", (project_id,)) as cursor:
             project = await cursor.fetchone()
             if not project:
                 raise HTTPException(status_code=404, detail="Project not found")
+    
+    # 使用用户提示词或项目关键字
+    user_prompt = page.prompt if page.prompt else project[1]
+    
+    job = await job_queue.enqueue(project_id, user_prompt, {"no_cache": page.no_cache})
+    await manager.broadcast_progress(str(project_id), "⏳ 已加入生成队列...", "progress")
+    
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "project_id": project_id,
+        "prompt": user_prompt,
+        "status_url": f"/api/jobs/{job['id']}"
+    }
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询生成任务状态"""
+    job = await job_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def save_page_version(project_id: int, project_path: str, html_content: Union[str, bytes], commit_message: str, generated_with: str) -> dict:
+    """写入页面、提交Git并记录版本和页面记录，返回页面记录ID、提交哈希和版本号；模板渲染的页面已是字节"""
+    # 保存HTML文件并提交，同一仓库的写入和提交串行执行
+    commit_hash = None
+    loop = asyncio.get_running_loop()
+    async with git_runner.repo_lock(project_path):
+        # 在线程池中原子写入页面，同时生成一次压缩变体，访问页面时直接返回
+        html_bytes = html_content if isinstance(html_content, bytes) else html_content.encode('utf-8')
+        await loop.run_in_executor(None, write_page, project_path, html_bytes)
         
-        project_name = project[0]
-        project_keyword = project[1]
-        project_path = os.path.join(PROJECTS_DIR, project_name)
+        # 只推送文件大小，页面内容通过页面地址获取
+        content_bytes = len(html_bytes)
+        await manager.broadcast_progress(
+            str(project_id),
+            f"💾 已保存 index.html ({content_bytes} 字节)",
+            "progress",
+            {"bytes": content_bytes}
+        )
         
-        # 使用用户提示词或项目关键字
-        user_prompt = page.prompt if page.prompt else project_keyword
+        # Git提交
+        try:
+            commit_hash = await commit_to_git(project_path, commit_message)
+            await manager.broadcast_progress(str(project_id), "📝 Git提交完成", "progress")
+        except Exception as e:
+            await manager.broadcast_progress(str(project_id), f"⚠️ Git提交失败: {str(e)}", "warning")
+        # 页面和变体的重命名在提交后统一持久化，一次目录fsync
+        await loop.run_in_executor(None, sync_directory, project_path)
+        page_cache.invalidate_current(project_id)
+    
+    version_hash = commit_hash[:7] if commit_hash else "unknown"
+    version = None
+    
+    # 记录版本并保存页面记录
+    async with db_pool.writer() as db:
+        if commit_hash:
+            version = await record_version(db, project_id, commit_hash, commit_message, generated_with)
+        cursor = await db.execute(
+            "INSERT INTO pages (project_id, url_id, version_hash) VALUES (?, ?, ?)",
+            (project_id, "index", version_hash)
+        )
+        page_id = cursor.lastrowid
+    
+    return {
+        "id": page_id,
+        "version": version,
+        "hash": version_hash,
+        "version_url": f"http://localhost:{PORT}/page/{project_id}/{version}" if version else None
+    }
+
+async def run_page_generation(job: dict) -> dict:
+    """后台worker执行的页面生成流程"""
+    project_id = job["project_id"]
+    user_prompt = job["prompt"]
+    
+    async with db_pool.reader() as db:
+        async with db.execute("SELECT name FROM projects WHERE id = ?", (project_id,)) as cursor:
+            project = await cursor.fetchone()
+    if not project:
+        raise Exception("Project not found")
+    
+    project_name = project[0]
+    project_path = os.path.join(PROJECTS_DIR, project_name)
+    if not os.path.isdir(project_path):
+        # 项目目录在运行期间被删除时重新创建
+        await ensure_project_directory(project_path)
+    commit_message = f"生成页面: {project_name} - {user_prompt}"
+    provisional = None
+    
+    async def publish_provisional(result: dict):
+        """生成超过deadline时，先把模板结果提交为临时版本，AI结果完成后再提交新版本替换"""
+        nonlocal provisional
+        saved = await save_page_version(
+            project_id, project_path, result["content"], f"临时版本: {project_name} - {user_prompt}", result["generated_with"]
+        )
+        provisional = dict(saved, generated_with=result["generated_with"])
+        await manager.broadcast_progress(
+            str(project_id),
+            f"📄 已发布临时版本 v{saved['version']}，AI生成完成后自动替换",
+            "progress",
+            {"provisional": True, "version": saved["version"]}
+        )
+    
+    # 广播进度开始
+    await manager.broadcast_progress(str(project_id), "🚀 开始生成页面...", "progress")
+    
+    try:
+        # 使用AI生成器生成网页内容
+        await manager.broadcast_progress(str(project_id), "🚀 开始AI生成...", "progress")
+        generation_result = await ai_generator.generate_webpage(
+            project_name, 
+            user_prompt, 
+            str(project_id),
+            use_cache=not job["options"].get("no_cache", False),
+            on_provisional=publish_provisional
+        )
         
-        # 广播进度开始
-        await manager.broadcast_progress(str(project_id), "🚀 开始生成页面...", "progress")
+        html_content = generation_result["content"]
+        generated_with = generation_result["generated_with"]
         
-        try:
-            # 使用AI生成器生成网页内容
-            await manager.broadcast_progress(str(project_id), "🚀 开始AI生成...", "progress")
-            generation_result = await ai_generator.generate_webpage(
-                project_name, 
-                user_prompt, 
-                str(project_id)
-            )
-            
-            html_content = generation_result["content"]
-            generated_with = generation_result["generated_with"]
-            
+        if generation_result.get("coalesced"):
+            # 合并到了进行中的相同生成，页面由发起者写入和提交
             await manager.broadcast_progress(
                 str(project_id), 
-                f"✅ 生成完成 (方式: {generated_with})", 
+                f"✅ 已复用进行中的生成结果 (方式: {generated_with})", 
                 "success"
             )
-            
-            #保存HTML文件
-            index_path = os.path.join(project_path, "index.html")
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            await manager.broadcast_progress(str(project_id), f"💾 {str(html_content)}", "progress")
-            
-            # Git提交
-            try:
-                commit_message = f"生成页面: {project_name} - {user_prompt}"
-                await commit_to_git(project_path, commit_message)
-                await manager.broadcast_progress(str(project_id), "📝 Git提交完成", "progress")
-            except Exception as e:
-                await manager.broadcast_progress(str(project_id), f"⚠️ Git提交失败: {str(e)}", "warning")
-            
-            # 获取最新的Git哈希
-            try:
-                hash_output = await exec_git_command("git rev-parse --short HEAD", project_path)
-                version_hash = hash_output.strip()
-            except:
-                version_hash = "unknown"
-            
-            # 保存页面记录
-            cursor = await db.execute(
-                "INSERT INTO pages (project_id, url_id, version_hash) VALUES (?, ?, ?)",
-                (project_id, "index", version_hash)
-            )
-            page_id = cursor.lastrowid
-            await db.commit()
-            
-            await manager.broadcast_progress(str(project_id), "✅ 页面生成完成!", "success")
-            
             return {
-                "id": page_id,
                 "url_id": "index",
-                "url": f"http://localhost:{PORT}/page/index",
-                "version": 1,
-                "hash": version_hash,
+                "url": f"http://localhost:{PORT}/page/{project_id}",
                 "generated_with": generated_with,
+                "cached": generation_result.get("cached", False),
                 "prompt": user_prompt,
-                "action": "created"
+                "action": "coalesced"
             }
-            
-        except Exception as e:
-            await manager.broadcast_progress(str(project_id), f"❌ 生成失败: {str(e)}", "error")
-            raise HTTPException(status_code=500, detail=str(e))
+        
+        if provisional and generated_with != "claude-code":
+            # AI生成失败后退回了模板，临时版本就是最终结果，不再重复提交
+            await manager.broadcast_progress(str(project_id), f"✅ 保留临时版本 (方式: {generated_with})", "success")
+            return {
+                "id": provisional["id"],
+                "url_id": "index",
+                "url": f"http://localhost:{PORT}/page/{project_id}",
+                "version_url": provisional["version_url"],
+                "version": provisional["version"],
+                "hash": provisional["hash"],
+                "generated_with": provisional["generated_with"],
+                "cached": False,
+                "prompt": user_prompt,
+                "action": "provisional",
+                "fallback_reason": generation_result.get("fallback_reason")
+            }
+        
+        await manager.broadcast_progress(
+            str(project_id), 
+            f"✅ 生成完成 (方式: {generated_with})", 
+            "success"
+        )
+        
+        saved = await save_page_version(project_id, project_path, html_content, commit_message, generated_with)
+        
+        await manager.broadcast_progress(str(project_id), "✅ 页面生成完成!", "success")
+        
+        return {
+            "id": saved["id"],
+            "url_id": "index",
+            "url": f"http://localhost:{PORT}/page/{project_id}",
+            "version_url": saved["version_url"],
+            "version": saved["version"],
+            "hash": saved["hash"],
+            "generated_with": generated_with,
+            "cached": generation_result.get("cached", False),
+            "prompt": user_prompt,
+            "action": "replaced_provisional" if provisional else "created",
+            "provisional_version": provisional["version"] if provisional else None
+        }
+        
+    except Exception as e:
+        await manager.broadcast_progress(str(project_id), f"❌ 生成失败: {str(e)}", "error")
+        raise
 
 @app.get("/api/projects/{project_id}/versions")
 async def get_project_versions(project_id: int):
     """获取版本历史"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.reader() as db:
         async with db.execute("SELECT name FROM projects WHERE id = ?", (project_id,)) as cursor:
             project = await cursor.fetchone()
             if not project:
                 raise HTTPException(status_code=404, detail="Project not found")
         
-        project_path = os.path.join(PROJECTS_DIR, project[0])
-        versions = await get_git_versions(project_path)
-        return versions
+        return await get_versions(db, project_id)
+
+@app.get("/api/projects/{project_id}/stream")
+async def stream_project_generation(project_id: int):
+    """实时预览：以分块HTTP响应转发最近一次生成的输出，生成进行中时边生成边返回"""
+    stream = generation_streams.get(str(project_id))
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No generation stream for this project")
+    
+    return StreamingResponse(
+        stream.iter_chunks(),
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def page_response(page: CachedPage, request: Request) -> Response:
+    """返回缓存的页面，按Accept-Encoding选择预压缩变体，客户端缓存仍有效时返回304"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), page.variants)
+    headers = {
+        "ETag": page.etag_for(encoding),
+        "Last-Modified": page.last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding"
+    }
+    if page_cache.is_not_modified(page, request.headers.get("if-none-match"), request.headers.get("if-modified-since"), encoding):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(page.variants[encoding], media_type="text/html", headers=headers)
+    return Response(page.content, media_type="text/html", headers=headers)
+
+async def resolve_project_route(project_id: int) -> Optional[str]:
+    """项目ID -> 项目名，优先使用内存路由表"""
+    name = page_cache.get_route(project_id)
+    if name is None:
+        async with db_pool.reader() as db:
+            async with db.execute("SELECT name FROM projects WHERE id = ?", (project_id,)) as cursor:
+                project = await cursor.fetchone()
+        if not project:
+            return None
+        name = project[0]
+        page_cache.set_route(project_id, name)
+    return name
+
+async def resolve_version_route(project_id: int, version: str) -> Optional[tuple]:
+    """版本号或提交哈希前缀 -> (完整提交哈希, 提交时间)，优先使用内存路由表"""
+    route = page_cache.get_version_route(project_id, version)
+    if route is not None:
+        return route
+    
+    is_hash = len(version) >= 7 and all(c in "0123456789abcdef" for c in version.lower())
+    if version.isdigit() and not is_hash:
+        query, params = "SELECT commit_hash, created_at FROM versions WHERE project_id = ? AND ordinal = ?", (project_id, int(version))
+    elif is_hash:
+        query, params = "SELECT commit_hash, created_at FROM versions WHERE project_id = ? AND hash = ?", (project_id, version[:7].lower())
+    else:
+        return None
+    
+    async with db_pool.reader() as db:
+        async with db.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
+    # 短哈希可能对应多个版本，按完整前缀筛选，仍有多个时视为有歧义
+    if is_hash:
+        rows = [row for row in rows if row[0].startswith(version.lower())]
+    if len(rows) != 1:
+        return None
+    row = rows[0]
+    
+    try:
+        committed_at = datetime.strptime(row[1], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        committed_at = datetime.now().timestamp()
+    page_cache.set_version_route(project_id, version, row[0], committed_at)
+    return row[0], committed_at
+
+async def current_page_response(project_id: int, project_name: str, request: Request) -> Response:
+    project_path = os.path.join(PROJECTS_DIR, project_name)
+    page = page_cache.get_current(project_id, project_path)
+    if page is None:
+        # 持有仓库锁读取，保证页面内容和HEAD提交一致
+        async with git_runner.repo_lock(project_path):
+            page = await page_cache.load_current(project_id, project_path)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return page_response(page, request)
 
 @app.get("/page/{url_id}")
-async def get_page(url_id: str):
-    """访问生成的页面"""
+async def get_page(url_id: str, request: Request):
+    """访问项目当前页面：/page/{项目ID}，/page/index 为最新创建的项目（内存缓存，ETag取自Git提交哈希）"""
     if url_id == "index":
         # 查找最新的项目
-        async with aiosqlite.connect(DATABASE_PATH) as db:
-            async with db.execute("SELECT name FROM projects ORDER BY created_at DESC LIMIT 1") as cursor:
-                project = await cursor.fetchone()
-                if not project:
-                    raise HTTPException(status_code=404, detail="No projects found")
-                
-                project_path = os.path.join(PROJECTS_DIR, project[0], "index.html")
-                if os.path.exists(project_path):
-                    return FileResponse(project_path, media_type="text/html")
+        latest = page_cache.get_latest_project()
+        if latest is None:
+            async with db_pool.reader() as db:
+                async with db.execute("SELECT id, name FROM projects ORDER BY created_at DESC LIMIT 1") as cursor:
+                    project = await cursor.fetchone()
+            if not project:
+                raise HTTPException(status_code=404, detail="No projects found")
+            latest = (project[0], project[1])
+            page_cache.set_latest_project(*latest)
+        return await current_page_response(latest[0], latest[1], request)
+    
+    if url_id.isdigit():
+        project_name = await resolve_project_route(int(url_id))
+        if project_name is not None:
+            return await current_page_response(int(url_id), project_name, request)
     
     raise HTTPException(status_code=404, detail="Page not found")
 
+async def load_version_page(project_id: int, version: str) -> CachedPage:
+    """按版本号或提交哈希读取历史版本页面，不存在时抛出404"""
+    project_name = await resolve_project_route(project_id)
+    if project_name is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    route = await resolve_version_route(project_id, version)
+    if route is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    commit_hash, committed_at = route
+    page = page_cache.get_version(project_id, commit_hash)
+    if page is None:
+        page = await page_cache.load_version(project_id, os.path.join(PROJECTS_DIR, project_name), commit_hash, committed_at)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return page
+
+@app.get("/page/{project_id}/{version}")
+async def get_page_version(project_id: int, version: str, request: Request):
+    """访问历史版本：version为版本号或提交哈希（至少7位），直接从Git对象读取，不访问工作区"""
+    page = await load_version_page(project_id, version)
+    return page_response(page, request)
+
+@app.get("/api/projects/{project_id}/diff")
+async def diff_versions(
+    project_id: int,
+    from_version: str = Query(..., alias="from"),
+    to_version: str = Query(..., alias="to")
+):
+    """比较两个版本的index.html，返回unified diff文本"""
+    old_page = await load_version_page(project_id, from_version)
+    new_page = await load_version_page(project_id, to_version)
+    
+    def unified_diff() -> str:
+        return "".join(difflib.unified_diff(
+            old_page.content.decode('utf-8', errors='replace').splitlines(keepends=True),
+            new_page.content.decode('utf-8', errors='replace').splitlines(keepends=True),
+            fromfile=f"{from_version}/index.html",
+            tofile=f"{to_version}/index.html"
+        ))
+    
+    diff = await asyncio.get_running_loop().run_in_executor(None, unified_diff)
+    return Response(diff, media_type="text/plain; charset=utf-8")
+
+@app.get("/api/admin/claude")
+async def get_claude_health():
+    """Claude Code熔断器状态和健康信息"""
+    return claude_breaker.snapshot()
+
+@app.post("/api/admin/claude/reset")
+async def reset_claude_breaker():
+    """手动关闭熔断器（例如安装了Claude Code之后），下一次生成重新尝试Claude"""
+    claude_breaker.reset()
+    return claude_breaker.snapshot()
+
 @app.get("/", response_class=HTMLResponse)
 async def get_index():
     """主页"""
@@ -552,6 +950,24 @@ async def get_index():
         
         <script>
             let ws;
+            // 当前订阅的项目和每个项目已收到的最大进度序号，重连后据此补发错过的事件
+            let subscribedProject = null;
+            const lastSeq = {};
+            
+            function subscribeProject(projectId) {
+                subscribedProject = projectId.toString();
+                if (!ws || ws.readyState !== WebSocket.OPEN) {
+                    return;
+                }
+                const message = {
+                    type: 'subscribe',
+                    projectId: subscribedProject
+                };
+                if (lastSeq[subscribedProject] !== undefined) {
+                    message.since = lastSeq[subscribedProject];
+                }
+                ws.send(JSON.stringify(message));
+            }
             
             function connectWebSocket() {
                 ws = new WebSocket(`ws://${window.location.host}/ws`);
@@ -561,7 +977,22 @@ async def get_index():
                         const data = JSON.parse(event.data);
                         if (data.type === 'subscribed') {
                             console.log('已订阅项目进度推送:', data.message);
+                            // 服务器重启后序号重新计数，按服务器的当前序号重置，否则之后的事件都会被当作重复丢弃
+                            if (lastSeq[data.projectId] === undefined || data.reset || data.seq < lastSeq[data.projectId]) {
+                                lastSeq[data.projectId] = data.seq;
+                            }
+                            if (data.truncated) {
+                                // 错过的事件已不在服务器历史中，重新加载项目列表
+                                loadProjects();
+                            }
                         } else {
+                            if (data.seq !== undefined) {
+                                // 跳过补发时重复收到的事件
+                                if (lastSeq[data.projectId] !== undefined && data.seq <= lastSeq[data.projectId]) {
+                                    return;
+                                }
+                                lastSeq[data.projectId] = data.seq;
+                            }
                             showProgress(data.message, data.type);
                         }
                     } catch (e) {
@@ -571,6 +1002,9 @@ async def get_index():
                 
                 ws.onopen = function() {
                     console.log('WebSocket连接已建立');
+                    if (subscribedProject !== null) {
+                        subscribeProject(subscribedProject);
+                    }
                 };
                 
                 ws.onclose = function(event) {
@@ -634,6 +1068,7 @@ async def get_index():
                                 <button class="btn btn-primary" onclick="generatePage(${project.id})">生成页面</button>
                                 <button class="btn btn-success" onclick="regenerateWithKeyword(${project.id})">重新生成</button>
                                 <button class="btn btn-primary" onclick="viewPage(${project.id})">查看页面</button>
+                                <button class="btn btn-secondary" onclick="previewGeneration(${project.id})">实时预览</button>
                                 <button class="btn btn-danger" onclick="deleteProject(${project.id})">删除</button>
                             </div>
                         `;
@@ -646,10 +1081,7 @@ async def get_index():
             
             async function generatePage(projectId) {
                 if (ws) {
-                    ws.send(JSON.stringify({
-                        type: 'subscribe',
-                        projectId: projectId.toString()
-                    }));
+                    subscribeProject(projectId);
                 }
                 
                 try {
@@ -728,10 +1160,7 @@ async def get_index():
                 if (confirm('确定要基于当前关键字重新生成页面吗？这将创建一个新的版本。')) {
                     // 订阅WebSocket进度
                     if (ws) {
-                        ws.send(JSON.stringify({
-                            type: 'subscribe',
-                            projectId: projectId.toString()
-                        }));
+                        subscribeProject(projectId);
                     }
                     
                     // 生成页面
@@ -755,7 +1184,11 @@ async def get_index():
             }
             
             function viewPage(projectId) {
-                window.open('/page/index', '_blank');
+                window.open(`/page/${projectId}`, '_blank');
+            }
+            
+            function previewGeneration(projectId) {
+                window.open(`/api/projects/${projectId}/stream`, '_blank');
             }
             
             async function deleteProject(projectId) {
@@ -792,6 +1225,8 @@ async def get_index():
                     if (response.ok) {
                         document.getElementById('projectForm').reset();
                         loadProjects();
+                    } else if (response.status === 409) {
+                        alert('项目名称已存在');
                     }
                 } catch (error) {
                     console.error('创建项目失败:', error);
@@ -807,5 +1242,18 @@ async def get_index():
     """
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
\ No newline at end of file
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-versions":
+        # 从Git历史重建版本索引: python main.py rebuild-versions [project_id]
+        async def _rebuild():
+            await db_pool.open(DATABASE_PATH)
+            try:
+                await init_database()
+                return await rebuild_versions(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+            finally:
+                await db_pool.close()
+        print(f"Rebuilt {asyncio.run(_rebuild())} versions")
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=PORT)
\ No newline at end of file
@@ -0,0 +1,257 @@
+from typing import Awaitable, Callable, List, Tuple, Union
+
+import aiosqlite
+
+MigrationStep = Union[str, Callable[[aiosqlite.Connection], Awaitable[None]]]
+
+
+async def rename_duplicate_projects(db: aiosqlite.Connection):
+    """项目名对应项目目录，重复的名称加上ID后缀；后缀名称已被其他项目使用时继续追加序号"""
+    async with db.execute("SELECT name FROM projects") as cursor:
+        taken = {row[0] for row in await cursor.fetchall()}
+    async with db.execute(
+        "SELECT id, name FROM projects WHERE id NOT IN (SELECT MIN(id) FROM projects GROUP BY name) ORDER BY id"
+    ) as cursor:
+        duplicates = await cursor.fetchall()
+
+    for project_id, name in duplicates:
+        new_name = f"{name}-{project_id}"
+        suffix = 2
+        while new_name in taken:
+            new_name = f"{name}-{project_id}-{suffix}"
+            suffix += 1
+        taken.add(new_name)
+        await db.execute("UPDATE projects SET name = ? WHERE id = ?", (new_name, project_id))
+
+
+# 数据库迁移：(版本号, 说明, 步骤列表)，步骤为SQL语句或接收数据库连接的异步函数，
+# 版本号记录在 PRAGMA user_version 中。已发布的迁移不要修改，新的表结构变化追加新版本
+MIGRATIONS: List[Tuple[int, str, List[MigrationStep]]] = [
+    (1, "基础表结构", [
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS pages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER,
+            url_id TEXT NOT NULL,
+            version_hash TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            project_id INTEGER,
+            prompt TEXT,
+            options TEXT,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS versions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            commit_hash TEXT NOT NULL,
+            message TEXT,
+            generated_with TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (project_id, ordinal),
+            UNIQUE (project_id, hash),
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS generation_cache (
+            key TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            generated_with TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_accessed REAL NOT NULL,
+            hit_count INTEGER DEFAULT 0
+        )
+        """,
+    ]),
+    (2, "热点查询索引、项目名唯一、外键级联删除", [
+        rename_duplicate_projects,
+        "CREATE UNIQUE INDEX idx_projects_name ON projects (name)",
+        "CREATE INDEX idx_projects_created_at ON projects (created_at)",
+
+        # 子表重建为 ON DELETE CASCADE 外键，丢弃已删除项目遗留的记录
+        """
+        CREATE TABLE pages_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            url_id TEXT NOT NULL,
+            version_hash TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        INSERT INTO pages_new (id, project_id, url_id, version_hash, created_at)
+        SELECT id, project_id, url_id, version_hash, created_at FROM pages
+        WHERE project_id IN (SELECT id FROM projects)
+        """,
+        "DROP TABLE pages",
+        "ALTER TABLE pages_new RENAME TO pages",
+        "CREATE INDEX idx_pages_project_id ON pages (project_id, id)",
+        "CREATE INDEX idx_pages_project_created_at ON pages (project_id, created_at)",
+
+        """
+        CREATE TABLE versions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            ordinal INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            commit_hash TEXT NOT NULL,
+            message TEXT,
+            generated_with TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (project_id, ordinal),
+            UNIQUE (project_id, hash)
+        )
+        """,
+        """
+        INSERT INTO versions_new (id, project_id, ordinal, hash, commit_hash, message, generated_with, created_at)
+        SELECT id, project_id, ordinal, hash, commit_hash, message, generated_with, created_at FROM versions
+        WHERE project_id IN (SELECT id FROM projects)
+        """,
+        "DROP TABLE versions",
+        "ALTER TABLE versions_new RENAME TO versions",
+
+        """
+        CREATE TABLE jobs_new (
+            id TEXT PRIMARY KEY,
+            project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            prompt TEXT,
+            options TEXT,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        )
+        """,
+        """
+        INSERT INTO jobs_new (id, project_id, prompt, options, status, result, error, created_at, started_at, finished_at)
+        SELECT id, project_id, prompt, options, status, result, error, created_at, started_at, finished_at FROM jobs
+        WHERE project_id IN (SELECT id FROM projects)
+        """,
+        "DROP TABLE jobs",
+        "ALTER TABLE jobs_new RENAME TO jobs",
+        "CREATE INDEX idx_jobs_status_created_at ON jobs (status, created_at)",
+
+        "CREATE INDEX idx_generation_cache_last_accessed ON generation_cache (last_accessed)",
+    ]),
+    (3, "跨进程进度事件表", [
+        """
+        CREATE TABLE progress_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT NOT NULL,
+            msg_type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+    ]),
+    (4, "版本索引按完整提交哈希去重，短哈希允许重复", [
+        # 7位短哈希在长历史中会发生前缀冲突，唯一约束改为完整提交哈希
+        """
+        CREATE TABLE versions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+            ordinal INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            commit_hash TEXT NOT NULL,
+            message TEXT,
+            generated_with TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (project_id, ordinal),
+            UNIQUE (project_id, commit_hash)
+        )
+        """,
+        """
+        INSERT INTO versions_new (id, project_id, ordinal, hash, commit_hash, message, generated_with, created_at)
+        SELECT id, project_id, ordinal, hash, commit_hash, message, generated_with, created_at FROM versions
+        """,
+        "DROP TABLE versions",
+        "ALTER TABLE versions_new RENAME TO versions",
+        "CREATE INDEX idx_versions_project_hash ON versions (project_id, hash)",
+    ]),
+    (5, "删除未使用的页面创建时间索引", [
+        # 页面列表按 (project_id, id) 游标分页，没有查询按创建时间排序页面
+        "DROP INDEX IF EXISTS idx_pages_project_created_at",
+    ]),
+    (6, "任务归属进程和租约心跳", [
+        # 多个worker进程共享任务表，只重新排队归属进程已退出（租约过期）的运行中任务
+        "ALTER TABLE jobs ADD COLUMN owner TEXT",
+        "ALTER TABLE jobs ADD COLUMN heartbeat_at REAL",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    async with db.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+
+async def apply_migrations(db: aiosqlite.Connection) -> int:
+    """按版本顺序在同一个事务中执行所有未应用的迁移，返回当前版本"""
+    current = await get_schema_version(db)
+    if current >= SCHEMA_VERSION:
+        return current
+
+    # 重建表期间需要关闭外键检查，该PRAGMA在事务内无效
+    await db.commit()
+    await db.execute("PRAGMA foreign_keys=OFF")
+    try:
+        # 多个worker进程同时启动时，由先拿到写锁的进程执行迁移，其余进程拿到锁后重新读取版本
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            current = await get_schema_version(db)
+            pending = [migration for migration in MIGRATIONS if migration[0] > current]
+            if not pending:
+                await db.commit()
+                return current
+
+            for version, description, statements in pending:
+                for statement in statements:
+                    if callable(statement):
+                        await statement(db)
+                    else:
+                        await db.execute(statement)
+                print(f"Applying database migration {version}: {description}")
+
+            async with db.execute("PRAGMA foreign_key_check") as cursor:
+                violations = await cursor.fetchall()
+            if violations:
+                raise Exception(f"Database migration left foreign key violations: {violations[:5]}")
+
+            await db.execute(f"PRAGMA user_version = {pending[-1][0]}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    finally:
+        await db.execute("PRAGMA foreign_keys=ON")
+
+    return pending[-1][0]
@@ -0,0 +1,379 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Dict, Tuple
+
+from git_objects import git_object_writer, UnsupportedRepositoryError
+from git_reader import git_object_reader
+from git_runner import git_runner
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 预压缩变体：内容编码 -> 文件后缀，按服务端偏好排序
+PAGE_ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+# 本进程的启动时间，早于该时间的本进程ID临时文件来自PID相同的上一个进程
+PROCESS_STARTED_AT = time.time()
+
+
+def compress_page(content: bytes) -> Dict[str, bytes]:
+    """按最高压缩级别生成压缩变体，没有安装brotli时只生成gzip"""
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write_file_atomic(path: str, data: bytes, fsync: bool = True):
+    """写入临时文件后原子替换，读取方只会看到旧文件或完整的新文件；目录项的持久化由调用方统一处理"""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def remove_stale_temp_files(project_path: str):
+    """
+    删除被中断的原子写入留下的临时文件（index.html*.<pid>.<tid>.tmp）。
+    这些文件会使进程内提交不可用，并在回退到 git add . 时被提交进历史；
+    仍在运行的进程（包括本进程启动后）写入的临时文件保留
+    """
+    try:
+        names = os.listdir(project_path)
+    except FileNotFoundError:
+        return
+    for name in names:
+        parts = name.split(".")
+        if not name.startswith("index.html") or len(parts) < 4 or parts[-1] != "tmp" or not parts[-3].isdigit():
+            continue
+        temp_path = os.path.join(project_path, name)
+        pid = int(parts[-3])
+        try:
+            if pid == os.getpid():
+                if os.stat(temp_path).st_mtime >= PROCESS_STARTED_AT:
+                    continue
+            else:
+                try:
+                    os.kill(pid, 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    continue
+            os.remove(temp_path)
+            print(f"Removed stale temp file: {temp_path}")
+        except FileNotFoundError:
+            pass
+
+
+def sync_directory(path: str):
+    """fsync目录，使其中文件的重命名持久化（不支持目录fsync的平台上忽略）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_page_variants(project_path: str, content: bytes, fsync: bool = False) -> Dict[str, bytes]:
+    """生成index.html的压缩变体并写在其旁边（不纳入Git提交），返回各变体内容"""
+    index_path = os.path.join(project_path, "index.html")
+    git_object_writer.ensure_excluded(project_path, ["index.html" + suffix for suffix in PAGE_ENCODINGS.values()])
+
+    variants = compress_page(content)
+    for encoding, data in variants.items():
+        write_file_atomic(index_path + PAGE_ENCODINGS[encoding], data, fsync)
+    return variants
+
+
+def write_page(project_path: str, content: bytes) -> Dict[str, bytes]:
+    """
+    原子写入index.html及其压缩变体（先写页面，变体的修改时间不早于页面），
+    文件内容在重命名前fsync；目录在Git提交后调用sync_directory一次性持久化。
+    调用方持有仓库锁，写入前清理上次崩溃留下的临时文件，避免其被提交
+    """
+    remove_stale_temp_files(project_path)
+    write_file_atomic(os.path.join(project_path, "index.html"), content)
+    return write_page_variants(project_path, content, fsync=True)
+
+
+def read_page_files(project_path: str) -> Optional[Tuple[str, bytes, os.stat_result, Dict[str, bytes]]]:
+    """读取页面、HEAD提交和压缩变体，变体缺失或比页面旧时重新生成"""
+    index_path = os.path.join(project_path, "index.html")
+    try:
+        with open(index_path, 'rb') as f:
+            content = f.read()
+            stat = os.fstat(f.fileno())
+    except FileNotFoundError:
+        return None
+
+    version = current_version(project_path, content)
+
+    variants = {}
+    for encoding, suffix in PAGE_ENCODINGS.items():
+        try:
+            with open(index_path + suffix, 'rb') as f:
+                if os.fstat(f.fileno()).st_mtime_ns >= stat.st_mtime_ns:
+                    variants[encoding] = f.read()
+        except FileNotFoundError:
+            pass
+    if "gzip" not in variants or (brotli is not None and "br" not in variants):
+        variants = write_page_variants(project_path, content)
+    return version, content, stat, variants
+
+
+def current_version(project_path: str, content: bytes) -> str:
+    """页面与HEAD提交中的index.html一致时返回提交哈希，否则（未提交、提交失败）返回内容哈希"""
+    head = git_object_writer.head_commit(project_path)
+    if head:
+        try:
+            if git_object_reader.file_sha_at(project_path, head, "index.html") == git_object_writer.hash_object("blob", content):
+                return head
+        except UnsupportedRepositoryError:
+            pass
+    return hashlib.sha1(content).hexdigest()
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> Optional[str]:
+    """根据Accept-Encoding选择压缩变体，q值相同时按服务端偏好，返回None表示不压缩"""
+    if not accept_encoding or not available:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        parts = item.strip().split(";")
+        coding = parts[0].strip().lower()
+        weight = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    best = None
+    best_weight = 0.0
+    for encoding in PAGE_ENCODINGS:
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CachedPage:
+    """已缓存的页面内容、压缩变体及其HTTP校验信息"""
+
+    def __init__(self, project_id: int, version: str, content: bytes, mtime: float, size: int, variants: Dict[str, bytes] = None):
+        self.project_id = project_id
+        self.version = version
+        self.content = content
+        # 只保留比原文小的压缩变体
+        self.variants = {
+            encoding: data for encoding, data in (variants or {}).items()
+            if len(data) < len(content)
+        }
+        self.etag = f'"{version}"'
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.mtime = int(mtime)
+        # 文件状态，用于定期确认其他进程没有改写页面
+        self.file_mtime = mtime
+        self.file_size = size
+        self.checked_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.content) + sum(len(data) for data in self.variants.values())
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """每种编码的表示使用不同的强ETag"""
+        return f'"{self.version}-{encoding}"' if encoding else self.etag
+
+
+class PageCache:
+    """
+    生成页面的内存缓存和路由表：按 (项目ID, 版本) 保存页面字节，版本为Git提交哈希。
+    历史版本不可变，直接从Git对象读取；当前版本在提交后失效，命中时不访问数据库和磁盘
+    """
+
+    def __init__(self):
+        self.max_bytes = 32 * 1024 * 1024
+        # 大于0时每隔该秒数检查一次文件是否被其他进程改写（多worker部署）
+        self.check_interval = 0.0
+        self.pages: "OrderedDict[Tuple[int, str], CachedPage]" = OrderedDict()
+        self.current: Dict[int, str] = {}  # 项目ID -> 当前版本
+        self.total_bytes = 0
+        # 路由表：项目ID -> 项目名，(项目ID, 版本号或短哈希) -> (提交哈希, 提交时间)
+        self.routes: Dict[int, str] = {}
+        self.version_routes: Dict[Tuple[int, str], Tuple[str, float]] = {}
+        # /page/index 对应的最新项目 (项目ID, 项目名)
+        self._latest: Optional[Tuple[int, str]] = None
+        self._latest_at = 0.0
+
+    def configure(self, max_bytes: int = None, check_interval: float = None):
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if check_interval is not None:
+            self.check_interval = check_interval
+
+    def get_latest_project(self) -> Optional[Tuple[int, str]]:
+        if self._latest is None or self._expired(self._latest_at):
+            return None
+        return self._latest
+
+    def set_latest_project(self, project_id: int, name: str):
+        self._latest = (project_id, name)
+        self._latest_at = time.monotonic()
+
+    def forget_latest_project(self):
+        """项目创建或删除后最新项目可能变化"""
+        self._latest = None
+
+    def get_route(self, project_id: int) -> Optional[str]:
+        return self.routes.get(project_id)
+
+    def set_route(self, project_id: int, name: str):
+        self.routes[project_id] = name
+
+    def get_version_route(self, project_id: int, version: str) -> Optional[Tuple[str, float]]:
+        return self.version_routes.get((project_id, version))
+
+    def set_version_route(self, project_id: int, version: str, commit_hash: str, committed_at: float):
+        # 版本号和提交哈希一经创建不再变化，可以一直缓存
+        self.version_routes[(project_id, version)] = (commit_hash, committed_at)
+
+    def get_current(self, project_id: int, project_path: str) -> Optional[CachedPage]:
+        version = self.current.get(project_id)
+        if version is None:
+            return None
+        page = self.pages.get((project_id, version))
+        if page is None:
+            return None
+
+        if self._expired(page.checked_at):
+            try:
+                stat = os.stat(os.path.join(project_path, "index.html"))
+            except FileNotFoundError:
+                self.invalidate_current(project_id)
+                return None
+            if stat.st_mtime != page.file_mtime or stat.st_size != page.file_size:
+                self.invalidate_current(project_id)
+                return None
+            page.checked_at = time.monotonic()
+
+        self.pages.move_to_end((project_id, version))
+        return page
+
+    async def load_current(self, project_id: int, project_path: str) -> Optional[CachedPage]:
+        """从磁盘读取项目当前页面并缓存，调用方需持有仓库锁以保证页面和HEAD一致"""
+        loaded = await asyncio.get_running_loop().run_in_executor(None, read_page_files, project_path)
+        if loaded is None:
+            return None
+        version, content, stat, variants = loaded
+        self.invalidate_current(project_id)
+        page = self.put(project_id, version, content, stat.st_mtime, stat.st_size, variants)
+        self.current[project_id] = version
+        return page
+
+    def get_version(self, project_id: int, commit_hash: str) -> Optional[CachedPage]:
+        page = self.pages.get((project_id, commit_hash))
+        if page is not None:
+            self.pages.move_to_end((project_id, commit_hash))
+        return page
+
+    async def load_version(self, project_id: int, project_path: str, commit_hash: str, committed_at: float) -> Optional[CachedPage]:
+        """从Git对象（松散或打包）读取历史版本并缓存，不访问工作区，无需仓库锁"""
+        loop = asyncio.get_running_loop()
+        try:
+            content = await loop.run_in_executor(None, git_object_reader.read_file_at, project_path, commit_hash, "index.html")
+        except UnsupportedRepositoryError:
+            # 读取器无法处理的仓库（例如使用了alternates），使用git命令行读取
+            try:
+                content = await git_runner.run_bytes(["git", "show", f"{commit_hash}:index.html"], project_path)
+            except Exception:
+                return None
+        except FileNotFoundError:
+            return None
+        if content is None:
+            return None
+
+        variants = await loop.run_in_executor(None, compress_page, content)
+        return self.put(project_id, commit_hash, content, committed_at, len(content), variants)
+
+    def put(self, project_id: int, version: str, content: bytes, mtime: float, size: int = None,
+            variants: Dict[str, bytes] = None) -> CachedPage:
+        """缓存页面内容"""
+        page = CachedPage(project_id, version, content, mtime, len(content) if size is None else size, variants)
+        previous = self.pages.pop((project_id, version), None)
+        if previous is not None:
+            self.total_bytes -= previous.nbytes
+        if page.nbytes <= self.max_bytes:
+            self.pages[(project_id, version)] = page
+            self.total_bytes += page.nbytes
+            self._evict()
+        return page
+
+    def invalidate_current(self, project_id: int):
+        """项目提交了新版本，当前版本需要重新读取；已缓存的历史版本仍然有效"""
+        self.current.pop(project_id, None)
+
+    def invalidate_project(self, project_id: int):
+        """项目删除后丢弃其全部缓存和路由"""
+        self.current.pop(project_id, None)
+        self.routes.pop(project_id, None)
+        for key in [key for key in self.version_routes if key[0] == project_id]:
+            del self.version_routes[key]
+        for key in [key for key in self.pages if key[0] == project_id]:
+            self.total_bytes -= self.pages.pop(key).nbytes
+
+    def is_not_modified(self, page: CachedPage, if_none_match: Optional[str], if_modified_since: Optional[str],
+                        encoding: Optional[str] = None) -> bool:
+        """条件请求判断：优先比较所选编码表示的ETag，没有If-None-Match时比较修改时间"""
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or page.etag_for(encoding) in tags
+        if if_modified_since:
+            try:
+                return int(parsedate_to_datetime(if_modified_since).timestamp()) >= page.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _evict(self):
+        # 按最近使用顺序淘汰
+        while self.total_bytes > self.max_bytes and self.pages:
+            (project_id, version), page = self.pages.popitem(last=False)
+            self.total_bytes -= page.nbytes
+            if self.current.get(project_id) == version:
+                del self.current[project_id]
+
+    def _expired(self, checked_at: float) -> bool:
+        return self.check_interval > 0 and time.monotonic() - checked_at >= self.check_interval
+
+# 全局页面缓存实例
+page_cache = PageCache()
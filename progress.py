@@ -0,0 +1,315 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Set, Any, Callable
+
+from fastapi.websockets import WebSocket
+
+from database import db_pool
+
+# 投递函数：(序号, 项目ID, 消息类型, 事件数据)，序号为None时由本进程分配
+DeliverCallback = Callable[[Optional[int], str, str, Dict[str, Any]], None]
+
+
+class ClientConnection:
+    """单个WebSocket连接：有界发送队列，由独立的写任务发送，慢客户端不影响其他连接"""
+    
+    def __init__(self, connection_id: str, websocket: WebSocket, max_queue: int, policy: str, send_timeout: float, on_close):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.project_id: Optional[str] = None
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._on_close = on_close
+        self._writer_task = asyncio.create_task(self._writer())
+    
+    def enqueue(self, msg_type: str, text: str) -> bool:
+        """加入发送队列（不等待发送），队列满时按慢客户端策略处理"""
+        if self.closed:
+            return False
+        
+        if len(self._queue) >= self.max_queue:
+            if self.policy == "disconnect":
+                self.close()
+                return False
+            if self.policy == "coalesce":
+                # 丢弃排队中的中间进度，只保留状态类消息
+                kept = deque(item for item in self._queue if item[0] != "progress")
+                self.dropped += len(self._queue) - len(kept)
+                self._queue = kept
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+        
+        self._queue.append((msg_type, text))
+        self._wakeup.set()
+        return True
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._writer_task.cancel()
+        asyncio.create_task(self._close_socket())
+        self._on_close(self.connection_id)
+    
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+    
+    async def _writer(self):
+        try:
+            while True:
+                while not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                _, text = self._queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # 发送失败或超时，连接视为已断开
+            self.close()
+
+
+class LocalBroadcastBackend:
+    """进程内广播：只推送给连接到本进程的WebSocket客户端"""
+    
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+    
+    async def stop(self):
+        pass
+    
+    async def publish(self, project_id: str, msg_type: str, data: Dict[str, Any]):
+        self._deliver(None, project_id, msg_type, data)
+
+
+class SQLiteBroadcastBackend:
+    """
+    基于SQLite的跨进程广播：事件写入progress_events表，自增ID即事件序号，
+    每个worker进程轮询新事件并推送给本进程的客户端，多个uvicorn worker共享同一数据库即可
+    """
+    
+    def __init__(self, poll_interval: float = 0.1, retention: int = 10000, batch_size: int = 500):
+        self.poll_interval = poll_interval
+        self.retention = retention  # 表中保留的最近事件数
+        self.batch_size = batch_size
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        # 只推送启动之后产生的事件
+        async with db_pool.reader() as db:
+            async with db.execute("SELECT COALESCE(MAX(id), 0) FROM progress_events") as cursor:
+                self._last_id = (await cursor.fetchone())[0]
+        self._task = asyncio.create_task(self._poll())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def publish(self, project_id: str, msg_type: str, data: Dict[str, Any]):
+        async with db_pool.writer() as db:
+            cursor = await db.execute(
+                "INSERT INTO progress_events (project_id, msg_type, payload, created_at) VALUES (?, ?, ?, ?)",
+                (project_id, msg_type, json.dumps(data), time.time())
+            )
+            # 按ID范围定期清理旧事件
+            if self.retention > 0 and cursor.lastrowid % 100 == 0:
+                await db.execute("DELETE FROM progress_events WHERE id <= ?", (cursor.lastrowid - self.retention,))
+    
+    async def _poll(self):
+        while True:
+            try:
+                delivered = await self._poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Progress event polling failed: {e}")
+                delivered = 0
+            # 积压时连续读取，否则等待下一个轮询周期
+            if delivered < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+    
+    async def _poll_once(self) -> int:
+        async with db_pool.reader() as db:
+            async with db.execute(
+                "SELECT id, project_id, msg_type, payload FROM progress_events WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_id, self.batch_size)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        
+        for event_id, project_id, msg_type, payload in rows:
+            self._last_id = event_id
+            self._deliver(event_id, project_id, msg_type, json.loads(payload))
+        return len(rows)
+
+
+def create_broadcast_backend(name: str, poll_interval: float = 0.1, retention: int = 10000):
+    """按名称创建广播后端：local（单进程）或 sqlite（多worker进程）"""
+    if name == "local":
+        return LocalBroadcastBackend()
+    if name == "sqlite":
+        return SQLiteBroadcastBackend(poll_interval=poll_interval, retention=retention)
+    raise ValueError(f"Unknown broadcast backend: {name}")
+
+
+class ConnectionManager:
+    """
+    WebSocket连接管理：按项目索引订阅，进度事件经广播后端发布，
+    再由各进程投递给本进程中订阅了该项目的连接
+    """
+    
+    def __init__(self, max_queue: int = 100, policy: str = "drop_oldest", send_timeout: float = 10, history_size: int = 50):
+        self.active_connections: Dict[str, ClientConnection] = {}
+        # 项目ID -> 订阅该项目的连接ID集合
+        self.project_connections: Dict[str, Set[str]] = {}
+        # 项目ID -> 最近的进度事件 (序号, 消息类型, JSON文本)，序号按项目单调递增
+        self.history: Dict[str, deque] = {}
+        self.sequences: Dict[str, int] = {}
+        # 项目ID -> 已移出历史的最大序号；SQLite后端的序号是全局事件ID，同一项目的序号不连续
+        self.evicted: Dict[str, int] = {}
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.history_size = history_size
+        self.backend = LocalBroadcastBackend()
+    
+    def configure(self, max_queue: int = None, policy: str = None, send_timeout: float = None,
+                  history_size: int = None, backend=None):
+        if max_queue is not None:
+            self.max_queue = max_queue
+        if policy is not None:
+            self.policy = policy
+        if send_timeout is not None:
+            self.send_timeout = send_timeout
+        if history_size is not None:
+            self.history_size = history_size
+        if backend is not None:
+            self.backend = backend
+    
+    async def start(self):
+        await self.backend.start(self.deliver)
+    
+    async def stop(self):
+        await self.backend.stop()
+    
+    async def connect(self, websocket: WebSocket, project_id: str = None):
+        await websocket.accept()
+        connection_id = str(uuid.uuid4())
+        self.active_connections[connection_id] = ClientConnection(
+            connection_id, websocket, self.max_queue, self.policy, self.send_timeout, self.disconnect
+        )
+        self.subscribe(connection_id, project_id)
+        return connection_id
+    
+    def subscribe(self, connection_id: str, project_id: Optional[str]) -> bool:
+        """订阅（或切换订阅）项目进度"""
+        connection = self.active_connections.get(connection_id)
+        if connection is None:
+            return False
+        
+        self._unindex(connection_id, connection.project_id)
+        connection.project_id = str(project_id) if project_id is not None else None
+        if connection.project_id is not None:
+            self.project_connections.setdefault(connection.project_id, set()).add(connection_id)
+        return True
+    
+    def replay(self, connection_id: str, project_id: str, since: int) -> Dict[str, Any]:
+        """补发序号大于since的历史事件，返回当前序号以及历史是否已被截断"""
+        project_id = str(project_id)
+        history = self.history.get(project_id, ())
+        current = self.sequences.get(project_id, 0)
+        if since > current:
+            # 客户端的序号比服务器还新，说明服务器重启后序号重新计数：
+            # 无法判断错过了哪些事件，不补发，由客户端按当前序号重置并重新加载
+            return {"seq": current, "replayed": 0, "truncated": True, "reset": True}
+        # 不保留历史时所有事件都视为已移出
+        last_evicted = self.evicted.get(project_id, 0) if self.history_size > 0 else current
+        
+        connection = self.active_connections.get(connection_id)
+        replayed = 0
+        if connection is not None:
+            for seq, msg_type, text in history:
+                if seq > since:
+                    connection.enqueue(msg_type, text)
+                    replayed += 1
+        
+        return {"seq": current, "replayed": replayed, "truncated": since < last_evicted, "reset": False}
+    
+    def forget_project(self, project_id: str):
+        """项目删除后丢弃其进度历史"""
+        self.history.pop(str(project_id), None)
+        self.sequences.pop(str(project_id), None)
+        self.evicted.pop(str(project_id), None)
+    
+    def disconnect(self, connection_id: str):
+        connection = self.active_connections.pop(connection_id, None)
+        if connection is not None:
+            self._unindex(connection_id, connection.project_id)
+            connection.close()
+    
+    def _unindex(self, connection_id: str, project_id: Optional[str]):
+        subscribers = self.project_connections.get(project_id)
+        if subscribers is not None:
+            subscribers.discard(connection_id)
+            if not subscribers:
+                del self.project_connections[project_id]
+    
+    def send(self, connection_id: str, data: dict) -> bool:
+        """通过发送队列向单个连接发送消息"""
+        connection = self.active_connections.get(connection_id)
+        if connection is None:
+            return False
+        return connection.enqueue(data.get("type", ""), json.dumps(data))
+    
+    async def broadcast_progress(self, project_id: str, message: str, msg_type: str = "progress", extra: Optional[Dict[str, Any]] = None):
+        progress_data = {
+            "type": msg_type,
+            "projectId": project_id,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        }
+        if extra:
+            progress_data.update(extra)
+        await self.backend.publish(str(project_id), msg_type, progress_data)
+    
+    def deliver(self, seq: Optional[int], project_id: str, msg_type: str, progress_data: Dict[str, Any]):
+        """由广播后端调用，把事件推送给本进程中订阅该项目的连接"""
+        # 记录序号并记入项目的进度历史，供晚订阅或重连的客户端补发
+        project_key = str(project_id)
+        if seq is None:
+            seq = self.sequences.get(project_key, 0) + 1
+        self.sequences[project_key] = seq
+        progress_data["seq"] = seq
+        text = json.dumps(progress_data)
+        if self.history_size > 0:
+            history = self.history.get(project_key)
+            if history is None:
+                history = self.history[project_key] = deque(maxlen=self.history_size)
+            if len(history) == history.maxlen:
+                self.evicted[project_key] = history[0][0]
+            history.append((seq, msg_type, text))
+        
+        # 只放入订阅该项目的连接的发送队列，不等待实际发送
+        for conn_id in list(self.project_connections.get(project_key, ())):
+            connection = self.active_connections.get(conn_id)
+            if connection is not None:
+                connection.enqueue(msg_type, text)
+
+# 全局连接管理实例
+manager = ConnectionManager()
@@ -75,12 +75,27 @@ if [ ! -z "$project_id" ]; then
         -H "Content-Type: application/json" \
         -d '{"prompt":"制作一个简单的计算器"}')
     
-    if echo "$response" | grep -q '"generated_with"'; then
-        echo "✅ 页面生成成功"
-        generated_with=$(echo "$response" | grep -o '"generated_with":"[^"]*"' | cut -d':' -f2 | tr -d '"')
-        echo "生成方式: $generated_with"
+    job_id=$(echo "$response" | grep -o '"job_id":"[^"]*"' | cut -d':' -f2 | tr -d '"')
+    if [ -z "$job_id" ]; then
+        echo "❌ 页面生成任务创建失败: $response"
     else
-        echo "❌ 页面生成失败: $response"
+        echo "任务ID: $job_id"
+        # 轮询任务状态
+        for i in $(seq 1 120); do
+            response=$(curl -s http://localhost:3000/api/jobs/$job_id)
+            if echo "$response" | grep -q -E '"status":"(succeeded|failed)"'; then
+                break
+            fi
+            sleep 3
+        done
+        
+        if echo "$response" | grep -q '"generated_with"'; then
+            echo "✅ 页面生成成功"
+            generated_with=$(echo "$response" | grep -o '"generated_with":"[^"]*"' | cut -d':' -f2 | tr -d '"')
+            echo "生成方式: $generated_with"
+        else
+            echo "❌ 页面生成失败: $response"
+        fi
     fi
 fi
 
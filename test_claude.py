@@ -25,10 +25,14 @@ async def test_claude_code():
         
         print(f"✅ 生成成功!")
         print(f"📝 生成方式: {result['generated_with']}")
-        print(f"📄 内容长度: {len(result['content'])} 字符")
+        # 模板渲染的结果是UTF-8字节
+        content = result['content']
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        print(f"📄 内容长度: {len(content)} 字符")
         
         # 预览内容前100字符
-        preview = result['content'][:100].replace('\n', ' ')
+        preview = content[:100].replace('\n', ' ')
         print(f"📋 内容预览: {preview}...")
         
     except Exception as e:
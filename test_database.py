@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+import aiosqlite
+
+from migrations import apply_migrations, SCHEMA_VERSION
+
+# 热点查询，与main.py中的SQL保持一致
+HOT_QUERIES = {
+    "项目列表": (
+        "SELECT * FROM projects ORDER BY created_at DESC", (),
+        "USING INDEX idx_projects_created_at"
+    ),
+    "最新项目": (
+        "SELECT id, name FROM projects ORDER BY created_at DESC LIMIT 1", (),
+        "USING INDEX idx_projects_created_at"
+    ),
+    "页面列表（首页）": (
+        """
+        SELECT p.id, p.project_id, p.url_id, p.version_hash, p.created_at, v.ordinal, v.message
+        FROM pages p
+        LEFT JOIN versions v ON v.id = (
+            SELECT MAX(id) FROM versions WHERE project_id = p.project_id AND hash = p.version_hash
+        )
+        WHERE p.project_id = ?
+        ORDER BY p.id DESC
+        LIMIT ?
+        """, (1, 51),
+        "USING INDEX idx_pages_project_id (project_id=?)"
+    ),
+    "页面列表（游标）": (
+        """
+        SELECT p.id, p.project_id, p.url_id, p.version_hash, p.created_at, v.ordinal, v.message
+        FROM pages p
+        LEFT JOIN versions v ON v.id = (
+            SELECT MAX(id) FROM versions WHERE project_id = p.project_id AND hash = p.version_hash
+        )
+        WHERE p.project_id = ? AND p.id < ?
+        ORDER BY p.id DESC
+        LIMIT ?
+        """, (1, 100, 51),
+        "USING INDEX idx_pages_project_id (project_id=? AND "
+    ),
+    "版本历史": (
+        "SELECT hash, message, ordinal, generated_with, created_at FROM versions WHERE project_id = ? ORDER BY ordinal", (1,),
+        "USING INDEX sqlite_autoindex_versions_1"
+    ),
+    "版本路由（版本号）": (
+        "SELECT commit_hash, created_at FROM versions WHERE project_id = ? AND ordinal = ?", (1, 3),
+        "USING INDEX sqlite_autoindex_versions_1 (project_id=? AND ordinal=?)"
+    ),
+    "版本路由（提交哈希）": (
+        "SELECT commit_hash, created_at FROM versions WHERE project_id = ? AND hash = ?", (1, "abcdef0"),
+        "USING INDEX idx_versions_project_hash (project_id=? AND hash=?)"
+    ),
+    "待恢复任务": (
+        "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at", (),
+        "USING INDEX idx_jobs_status_created_at"
+    ),
+    "进度事件轮询": (
+        "SELECT id, project_id, msg_type, payload FROM progress_events WHERE id > ? ORDER BY id LIMIT ?", (0, 500),
+        "USING INTEGER PRIMARY KEY (rowid>?)"
+    ),
+    "缓存淘汰": (
+        "SELECT key, size FROM generation_cache ORDER BY last_accessed DESC", (),
+        "USING INDEX idx_generation_cache_last_accessed"
+    ),
+}
+
+# 迁移前的旧表结构
+LEGACY_SCHEMA = """
+CREATE TABLE projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER,
+    url_id TEXT NOT NULL,
+    version_hash TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (project_id) REFERENCES projects (id)
+);
+"""
+
+
+def _migrate(db_path: str):
+    async def run():
+        async with aiosqlite.connect(db_path) as db:
+            return await apply_migrations(db)
+    return asyncio.run(run())
+
+
+def _new_database(legacy: bool = False) -> str:
+    db_path = os.path.join(tempfile.mkdtemp(), "projects.db")
+    if legacy:
+        with sqlite3.connect(db_path) as db:
+            db.executescript(LEGACY_SCHEMA)
+            db.executemany("INSERT INTO projects (name, keyword) VALUES (?, ?)", [
+                ("demo", "计算器"), ("demo", "刷题"), ("other", "hello"), ("demo-2", "已占用的去重名称")
+            ])
+            db.executemany("INSERT INTO pages (project_id, url_id, version_hash) VALUES (?, ?, ?)", [
+                (1, "index", "aaaaaaa"), (2, "index", "bbbbbbb"), (99, "index", "orphan0")
+            ])
+    return db_path
+
+
+def test_query_plans_use_indexes():
+    db_path = _new_database()
+    _migrate(db_path)
+    db = sqlite3.connect(db_path)
+
+    for name, (query, params, expected) in HOT_QUERIES.items():
+        plan = " | ".join(row[3] for row in db.execute("EXPLAIN QUERY PLAN " + query, params))
+        assert expected in plan, f"{name}: {plan}"
+        assert "TEMP B-TREE" not in plan, f"{name}: {plan}"
+        print(f"✅ {name}: {plan}")
+
+
+def test_legacy_database_migration():
+    db_path = _new_database(legacy=True)
+    assert _migrate(db_path) == SCHEMA_VERSION
+    # 重复执行不做任何修改
+    assert _migrate(db_path) == SCHEMA_VERSION
+
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA foreign_keys=ON")
+
+    names = [row[0] for row in db.execute("SELECT name FROM projects ORDER BY id")]
+    # 去重后缀 demo-2 已被其他项目使用，继续追加序号
+    assert names == ["demo", "demo-2-2", "other", "demo-2"], names
+
+    pages = [row[0] for row in db.execute("SELECT version_hash FROM pages ORDER BY id")]
+    assert pages == ["aaaaaaa", "bbbbbbb"], pages
+
+    try:
+        db.execute("INSERT INTO projects (name, keyword) VALUES ('demo', 'x')")
+        raise AssertionError("duplicate project name accepted")
+    except sqlite3.IntegrityError:
+        pass
+
+    db.execute("INSERT INTO versions (project_id, ordinal, hash, commit_hash) VALUES (1, 1, 'aaaaaaa', 'aaaaaaa1')")
+    # 短哈希相同、完整提交哈希不同的版本可以共存
+    db.execute("INSERT INTO versions (project_id, ordinal, hash, commit_hash) VALUES (1, 2, 'aaaaaaa', 'aaaaaaa2')")
+    try:
+        db.execute("INSERT INTO versions (project_id, ordinal, hash, commit_hash) VALUES (1, 3, 'aaaaaaa', 'aaaaaaa2')")
+        raise AssertionError("duplicate commit hash accepted")
+    except sqlite3.IntegrityError:
+        pass
+    db.execute("INSERT INTO jobs (id, project_id, status) VALUES ('job', 1, 'queued')")
+    db.execute("DELETE FROM projects WHERE id = 1")
+    for table in ("pages", "versions", "jobs"):
+        count = db.execute(f"SELECT COUNT(*) FROM {table} WHERE project_id = 1").fetchone()[0]
+        assert count == 0, f"{table} not cascaded"
+    print("✅ 旧数据库迁移、名称去重、级联删除")
+
+
+if __name__ == "__main__":
+    print("🧪 测试数据库迁移和查询计划...")
+    test_query_plans_use_indexes()
+    test_legacy_database_migration()
+    print("🎉 测试完成！")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import tempfile
+
+from git_objects import git_object_writer
+from git_reader import GitObjectReader
+
+COMMIT_COUNT = 30
+
+
+def _git(repo_path: str, *args: str) -> bytes:
+    return subprocess.run(["git", *args], cwd=repo_path, capture_output=True, check=True).stdout
+
+
+def _write_history(repo_path: str):
+    """用进程内写入器提交多个版本，相邻版本只改动少量内容，打包后形成增量链"""
+    git_object_writer.init_repo(repo_path)
+    lines = [f"<p>第{line}行 {'内容' * (line % 7)}</p>" for line in range(300)]
+    commits = []
+    for index in range(COMMIT_COUNT):
+        # 每个版本在上一版本基础上再改一行
+        lines[index * 7] = f"<p>版本 {index} 修改了这一行</p>"
+        content = ("<!DOCTYPE html>\n" + "\n".join(lines) + "\n").encode('utf-8')
+        with open(os.path.join(repo_path, "index.html"), 'wb') as f:
+            f.write(content)
+        commits.append(git_object_writer.commit_file(repo_path, "index.html", f"版本 {index}"))
+    return commits
+
+
+def _assert_reader_matches_git(repo_path: str, commits):
+    # 每次使用新的读取器，不受之前缓存的结果影响
+    reader = GitObjectReader()
+    for commit_sha in commits:
+        expected = _git(repo_path, "show", f"{commit_sha}:index.html")
+        assert reader.read_file_at(repo_path, commit_sha, "index.html") == expected, commit_sha
+
+
+def test_written_objects_pass_fsck():
+    repo_path = tempfile.mkdtemp()
+    commits = _write_history(repo_path)
+    _git(repo_path, "fsck", "--strict")
+    assert _git(repo_path, "rev-list", "HEAD").decode().split() == commits[::-1]
+    _assert_reader_matches_git(repo_path, commits)
+    print("✅ 进程内写入的对象通过 git fsck --strict，松散对象读取一致")
+
+
+def _assert_packed(repo_path: str):
+    counts = dict(line.split(": ") for line in _git(repo_path, "count-objects", "-v").decode().splitlines())
+    assert counts["count"] == "0" and counts["in-pack"] != "0", counts
+
+
+def test_reader_matches_git_after_aggressive_gc():
+    repo_path = tempfile.mkdtemp()
+    commits = _write_history(repo_path)
+    # 增量以偏移引用基对象（OFS_DELTA）
+    _git(repo_path, "gc", "--aggressive", "--quiet")
+    _assert_packed(repo_path)
+    _assert_reader_matches_git(repo_path, commits)
+    print("✅ git gc --aggressive 打包后读取结果与 git show 一致")
+
+
+def test_reader_matches_git_with_ref_deltas():
+    repo_path = tempfile.mkdtemp()
+    commits = _write_history(repo_path)
+    # 关闭偏移引用后，增量以基对象哈希引用基对象（REF_DELTA）
+    _git(repo_path, "-c", "repack.useDeltaBaseOffset=false", "repack", "-a", "-d", "-f", "--depth=50", "--quiet")
+    _assert_packed(repo_path)
+    _assert_reader_matches_git(repo_path, commits)
+    print("✅ REF_DELTA打包后读取结果与 git show 一致")
+
+
+if __name__ == "__main__":
+    print("🧪 测试Git对象读写...")
+    test_written_objects_pass_fsck()
+    test_reader_matches_git_after_aggressive_gc()
+    test_reader_matches_git_with_ref_deltas()
+    print("🎉 测试完成！")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import tempfile
+
+from git_objects import git_object_writer
+from page_cache import write_page
+
+
+def _exited_pid() -> int:
+    """返回一个已退出进程的PID"""
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def test_leftover_temp_file_is_not_committed():
+    project_path = tempfile.mkdtemp()
+    git_object_writer.init_repo(project_path)
+    write_page(project_path, b"<html>v1</html>")
+    git_object_writer.commit_file(project_path, "index.html", "v1")
+
+    # 模拟写入过程中被杀死的进程留下的临时文件
+    leftover = os.path.join(project_path, f"index.html.{_exited_pid()}.1.tmp")
+    with open(leftover, 'wb') as f:
+        f.write(b"<html>partial")
+
+    write_page(project_path, b"<html>v2</html>")
+    assert not os.path.exists(leftover), "stale temp file kept"
+    commit_sha = git_object_writer.commit_file(project_path, "index.html", "v2")
+
+    files = subprocess.run(
+        ["git", "ls-tree", "--name-only", commit_sha], cwd=project_path,
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert files == ["index.html"], files
+    print("✅ 崩溃遗留的临时文件在写入前被清理")
+
+
+if __name__ == "__main__":
+    print("🧪 测试页面写入...")
+    test_leftover_temp_file_is_not_committed()
+    print("🎉 测试完成！")
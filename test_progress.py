@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+from progress import ConnectionManager
+
+
+class RecordingConnection:
+    """记录补发消息的连接，代替真实的WebSocket连接"""
+
+    def __init__(self):
+        self.sent = []
+
+    def enqueue(self, msg_type: str, text: str) -> bool:
+        self.sent.append(msg_type)
+        return True
+
+
+def _manager(history_size: int = 50) -> ConnectionManager:
+    manager = ConnectionManager(history_size=history_size)
+    manager.active_connections["client"] = RecordingConnection()
+    return manager
+
+
+def test_replay_after_server_restart():
+    # 服务器重启后序号从1重新计数，客户端仍带着重启前的序号订阅
+    manager = _manager()
+    manager.deliver(None, "1", "progress", {"message": "开始"})
+
+    ack = manager.replay("client", "1", 40)
+    assert ack["reset"] and ack["truncated"], ack
+    assert ack["seq"] == 1 and ack["replayed"] == 0, ack
+
+    ack = manager.replay("client", "1", 0)
+    assert not ack["reset"] and not ack["truncated"] and ack["replayed"] == 1, ack
+    print("✅ 服务器重启后的序号重置")
+
+
+def test_replay_with_sparse_sequences():
+    # SQLite后端的序号是全局事件ID，同一项目的序号之间有间隔
+    manager = _manager(history_size=2)
+    for seq in (3, 6, 9, 12, 15):
+        manager.deliver(seq, "1", "progress", {"message": f"事件{seq}"})
+
+    ack = manager.replay("client", "1", 9)
+    assert not ack["truncated"] and ack["replayed"] == 2, ack
+
+    ack = manager.replay("client", "1", 6)
+    assert ack["truncated"] and ack["replayed"] == 2, ack
+    print("✅ 不连续序号的补发和截断判断")
+
+
+if __name__ == "__main__":
+    print("🧪 测试进度事件补发...")
+    test_replay_after_server_restart()
+    test_replay_with_sparse_sequences()
+    print("🎉 测试完成！")